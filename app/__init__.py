@@ -5,7 +5,7 @@ from .utils.monitoring import init_request_monitoring, start_metrics_server
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, current_user
 from flask_migrate import Migrate
-from config import config
+from config import config, basedir
 import os
 from apscheduler.schedulers.background import BackgroundScheduler
 import atexit
@@ -17,11 +17,31 @@ migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 
+scheduler = BackgroundScheduler(daemon=True)
+
+def start_scheduler():
+    if not scheduler.running:
+        scheduler.start()
+        atexit.register(lambda: scheduler.shutdown(wait=False))
+
+def init_database(app):
+    """Create missing tables, then bring existing ones up to date with the migrations."""
+    from flask_migrate import upgrade
+    with app.app_context():
+        db.create_all()
+        upgrade()
+
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    from app.utils.db_engine import engine_options, configure_engine
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        configure_engine(db.engine, app.config)
+    from app.services.stats_service import init_dashboard_stats
+    init_dashboard_stats(app)
+    migrate.init_app(app, db, directory=os.path.join(basedir, 'migrations'), render_as_batch=True)
     login_manager.init_app(app)
 
     csrf.init_app(app)
@@ -2,48 +2,43 @@
 from flask import render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
 from app import db
-from app.models import User, Project, AdminActivity, CodeFile, FeatureFlag, ProjectStep
+from app.models import User, Project, AdminActivity, CodeFile, FeatureFlag, ProjectStep, PlanCacheEntry
+from app.services.revision_service import delete_file_revisions
+from app.services.stats_service import current_stats, recent_days, status_counts, discount_projects
 from app.utils.feature_flags import set_feature_flag
+from app.utils.keyset import keyset_paginate
+from app.utils.plan_cache import plan_cache
 from app.utils.decorators import admin_required, log_activity
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 import csv
 from io import StringIO
 from . import admin
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload, undefer
 
 @admin.route('/dashboard')
 @login_required
 @admin_required
 def dashboard():
-    
-    total_users = User.query.count()
-    active_users = User.query.filter(User.last_login >= datetime.utcnow() - timedelta(days=1)).count()
-    new_users = User.query.filter(User.created_at >= datetime.utcnow() - timedelta(days=7)).count()
-    
-    
-    total_projects = Project.query.count()
-    completed_projects = Project.query.filter_by(status='completed').count()
-    
-    
-    recent_activities = AdminActivity.query.order_by(AdminActivity.timestamp.desc()).limit(10).all()
-    
-    
-    usage_query = Project.query.with_entities(
-        Project.status, func.count(Project.id)
-    ).group_by(Project.status).all()
-    
-    usage_data = {status: count for status, count in usage_query}
-    
+    stats = current_stats()
+    today = datetime.utcnow().date()
+    days = recent_days(7, today)
+    active_users = days[today].active_users if today in days else 0
+    new_users = sum(day.new_users for day in days.values())
+
+    recent_activities = AdminActivity.query.options(joinedload(AdminActivity.admin))\
+        .order_by(AdminActivity.timestamp.desc()).limit(10).all()
+
     return render_template(
         'admin/dashboard.html',
-        total_users=total_users,
+        total_users=stats.total_users,
         active_users=active_users,
         new_users=new_users,
-        total_projects=total_projects,
-        completed_projects=completed_projects,
+        total_projects=stats.total_projects,
+        completed_projects=stats.completed_projects,
         recent_activities=recent_activities,
-        usage_data=json.dumps(usage_data),  
+        usage_data=json.dumps(status_counts(stats)),
         now=datetime.utcnow()
     )
 
@@ -51,9 +46,8 @@ def dashboard():
 @login_required
 @admin_required
 def user_management():
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
-    users = User.query.order_by(User.created_at.desc()).paginate(page=page, per_page=per_page)
+    users = keyset_paginate(User.query, (User.created_at, User.id),
+                            after=request.args.get('after'), before=request.args.get('before'), per_page=20)
     return render_template('admin/users.html', users=users)
 
 @admin.route('/user/<int:user_id>/toggle-admin', methods=['POST'])
@@ -101,7 +95,9 @@ def delete_user(user_id):
         return redirect(url_for('admin.user_management'))
     
     
-    Project.query.filter_by(user_id=user_id).delete()
+    user_projects = Project.query.filter_by(user_id=user_id)
+    discount_projects(user_projects)
+    user_projects.delete()
     
     db.session.delete(user)
     db.session.commit()
@@ -113,9 +109,9 @@ def delete_user(user_id):
 @login_required
 @admin_required
 def project_management():
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
-    projects = Project.query.order_by(Project.created_at.desc()).paginate(page=page, per_page=per_page)
+    query = Project.query.options(joinedload(Project.owner), undefer(Project.file_count), undefer(Project.step_count))
+    projects = keyset_paginate(query, (Project.created_at, Project.id),
+                               after=request.args.get('after'), before=request.args.get('before'), per_page=20)
     return render_template('admin/projects.html', projects=projects)
 
 @admin.route('/project/<int:project_id>/delete', methods=['POST'])
@@ -126,6 +122,7 @@ def delete_project(project_id):
     project = Project.query.get_or_404(project_id)
     
     
+    delete_file_revisions(project_id)
     CodeFile.query.filter_by(project_id=project_id).delete()
     
     
@@ -139,9 +136,9 @@ def delete_project(project_id):
 @login_required
 @admin_required
 def admin_activities():
-    page = request.args.get('page', 1, type=int)
-    per_page = 50
-    activities = AdminActivity.query.order_by(AdminActivity.timestamp.desc()).paginate(page=page, per_page=per_page)
+    activities = keyset_paginate(AdminActivity.query.options(joinedload(AdminActivity.admin)),
+                                 (AdminActivity.timestamp, AdminActivity.id),
+                                 after=request.args.get('after'), before=request.args.get('before'), per_page=50)
     return render_template('admin/activities.html', activities=activities)
 
 @admin.route('/feature-flags')
@@ -172,3 +169,36 @@ def create_feature_flag():
     db.session.commit()
     flash(f'Feature flag "{new_flag.name}" created successfully.', 'success')
     return redirect(url_for('admin.feature_flags'))
+
+@admin.route('/plan-cache')
+@login_required
+@admin_required
+def plan_cache_entries():
+    page = request.args.get('page', 1, type=int)
+    per_page = 50
+    entries = PlanCacheEntry.query.order_by(PlanCacheEntry.hits.desc(), PlanCacheEntry.id.desc()).paginate(page=page, per_page=per_page)
+    total_hits = db.session.query(func.coalesce(func.sum(PlanCacheEntry.hits), 0)).scalar()
+    return render_template(
+        'admin/plan_cache.html',
+        entries=entries,
+        stats=plan_cache.stats(),
+        total_hits=total_hits
+    )
+
+@admin.route('/plan-cache/<int:entry_id>/invalidate', methods=['POST'])
+@login_required
+@admin_required
+@log_activity('Invalidate plan cache entry', 'plan_cache')
+def invalidate_plan_cache_entry(entry_id):
+    plan_cache.invalidate(entry_id)
+    flash('Plan cache entry removed.', 'success')
+    return redirect(url_for('admin.plan_cache_entries'))
+
+@admin.route('/plan-cache/clear', methods=['POST'])
+@login_required
+@admin_required
+@log_activity('Clear plan cache', 'plan_cache')
+def clear_plan_cache():
+    plan_cache.clear()
+    flash('Plan cache cleared.', 'success')
+    return redirect(url_for('admin.plan_cache_entries'))
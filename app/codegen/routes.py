@@ -2,13 +2,17 @@ from flask import render_template, request, jsonify, url_for, current_app, send_
 import os
 from flask_login import login_required, current_user
 from app import db
-from app.models import Project, ProjectStep
-from app.utils.intent_utils import check_code_intent
-from app.utils.prompt_improver import improve_prompt
-from app.services.codegen_service import generate_step
-from app.services.zip_service import create_project_zip, recreate_project_from_db
+from app.models import CodeFile, Project, ProjectStep
+from app.services.planning_service import resolve_intent_and_plan
+from app.services.generation_executor import generation_executor, QueueFullError
+from app.services.job_queue import (
+    active_job, enqueue_project, ensure_heartbeat, process_worker_id, queued_count, run_job,
+    queue_position as queue_position_for
+)
+from app.services.project_runner import build_step_graph, parse_depends_on
+from app.services.revision_service import diff_revisions, rollback_to_step
+from app.services.zip_service import create_project_zip, discard_project_artifacts, recreate_project_from_db
 from datetime import datetime
-import threading
 from app.codegen import codegen
 from flask import after_this_request
 import shutil
@@ -30,6 +34,99 @@ def _normalize_deliverables(value):
         return str(value)
     return value
 
+def _normalize_depends_on(value):
+    numbers = parse_depends_on(value)
+    return json.dumps(numbers) if numbers is not None else None
+
+def _generation_queue_full():
+    if current_app.config.get('GENERATION_BACKEND') == 'worker':
+        return queued_count() >= current_app.config['GENERATION_QUEUE_SIZE']
+    return generation_executor.is_full()
+
+def _queue_position(project_id):
+    position = generation_executor.position(project_id)
+    if position is None:
+        position = queue_position_for(project_id)
+    return position
+
+def _queue_full_response():
+    response = jsonify({
+        "success": False,
+        "message": "The generator is busy right now. Please try again in a minute."
+    })
+    response.headers['Retry-After'] = '30'
+    return response, 503
+
+def _dispatch_generation(project_id, step_id=None):
+    """Queue a generation job for the project (or one of its steps) and return its queue position.
+
+    Raises ``QueueFullError`` after removing the job when the in-process executor is full.
+    """
+    if current_app.config.get('GENERATION_BACKEND') == 'worker':
+        enqueue_project(project_id, step_id=step_id)
+        return queue_position_for(project_id)
+
+    app_obj = current_app._get_current_object()
+    worker_id = process_worker_id()
+    ensure_heartbeat(app_obj, worker_id)
+    job = enqueue_project(project_id, worker_id=worker_id, step_id=step_id)
+    try:
+        return generation_executor.submit(
+            project_id,
+            run_job,
+            app_obj,
+            job.id,
+            worker_id,
+            timeout=current_app.config.get('GENERATION_QUEUE_TIMEOUT')
+        )
+    except QueueFullError:
+        db.session.delete(job)
+        db.session.commit()
+        raise
+
+def _requeue(project, steps, step_id=None):
+    """Reset ``steps`` to pending and queue them again, keeping the stored plan and files.
+
+    With ``step_id`` the job runs only that step; otherwise every step that is not completed.
+    """
+    if active_job(project.id):
+        return jsonify({
+            "success": False,
+            "message": "This project is already being generated."
+        }), 409
+    if _generation_queue_full():
+        return _queue_full_response()
+
+    previous = {s.id: s.status for s in steps}
+    previous_project_status = project.status
+    for s in steps:
+        s.status = 'pending'
+    project.status = 'queued'
+    db.session.commit()
+
+    try:
+        queue_position = _dispatch_generation(project.id, step_id=step_id)
+    except QueueFullError as e:
+        print(f"[WARN] {e}; leaving project {project.id} as it was")
+        for s in steps:
+            s.status = previous[s.id]
+        project.status = previous_project_status
+        db.session.commit()
+        return _queue_full_response()
+
+    print(f"[DEBUG] Project {project.id} re-queued with {len(steps)} step(s) at position {queue_position}")
+    return jsonify({
+        "success": True,
+        "project_id": project.id,
+        "queue_position": queue_position,
+        "steps": [{
+            "id": s.id,
+            "step_number": s.step_number,
+            "title": s.title,
+            "status": s.status
+        } for s in sorted(project.steps, key=lambda x: x.step_number)]
+    })
+
 @codegen.route('/generate', methods=['POST'])
 @login_required
 def generate_code():
@@ -45,9 +142,13 @@ def generate_code():
         print("[DEBUG] No prompt provided, returning 400")
         return jsonify({"success": False, "message": "Prompt is required"}), 400
 
+    if _generation_queue_full():
+        print("[DEBUG] Generation queue full, returning 503")
+        return _queue_full_response()
+
     
-    print("[DEBUG] Checking if prompt is code-related")
-    intent_result = check_code_intent(prompt)
+    print("[DEBUG] Checking if prompt is code-related and building the plan")
+    intent_result, improved_data = resolve_intent_and_plan(prompt)
     print(f"[DEBUG] Intent check result: {intent_result}")
 
     if not intent_result.get('is_code_related', False):
@@ -58,9 +159,6 @@ def generate_code():
             "reason": intent_result.get('reason', 'Not code-related')
         }), 400
 
-    
-    print("[DEBUG] Improving prompt")
-    improved_data = improve_prompt(prompt)
     print(f"[DEBUG] Improved prompt data: {improved_data}")
 
     project = Project(
@@ -68,7 +166,7 @@ def generate_code():
         title=f"Project {datetime.now().strftime('%Y-%m-%d %H:%M')}",
         original_prompt=prompt,
         improved_prompt=improved_data.get('improved_prompt', ''),
-        status='in-progress'
+        status='queued'
     )
     db.session.add(project)
     db.session.commit()
@@ -86,6 +184,7 @@ def generate_code():
             title=step_data.get('title', 'Untitled Step'),
             details=step_data.get('details', ''),
             deliverables=deliverables_value,   
+            depends_on=_normalize_depends_on(step_data.get('depends_on')),
             status='pending'
         )
         db.session.add(step)
@@ -94,114 +193,21 @@ def generate_code():
     db.session.commit()
     print("[DEBUG] All steps committed to the database")
 
-    def background_generation(app, project_id):
-        with app.app_context():
-            print(f"[DEBUG] Starting background generation for project ID: {project_id}")
-            project = Project.query.get(project_id)
-            if not project:
-                print(f"[DEBUG] Project {project_id} not found")
-                return
-
-            
-            steps_local = ProjectStep.query.filter_by(project_id=project.id).order_by(ProjectStep.step_number.asc()).all()
-            print(f"[DEBUG] Number of steps to process: {len(steps_local)}")
-
-            any_failed = False
-
-            for idx, step_row in enumerate(steps_local, start=1):
-                try:
-                    
-                    step = ProjectStep.query.get(step_row.id)
-                    if not step:
-                        print(f"[WARN] Step id {step_row.id} disappeared; skipping")
-                        any_failed = True
-                        continue
-
-                    print(f"[DEBUG] === PIPELINE STEP {step.step_number} / {len(steps_local)}: {step.title} ===")
-
-                    
-                    step_text = (step.details or "").strip()
-                    if not step_text:
-                        fallback_bits = []
-                        if step.title:
-                            fallback_bits.append(f"Title: {step.title}")
-                        if getattr(step, "deliverables", None):
-                            fallback_bits.append(f"Deliverables: {step.deliverables}")
-                        step_text = "\n".join(fallback_bits).strip() or f"Implement step #{step.step_number}"
-
-                    print(f"[DEBUG] Step {step.step_number} details length: {len(step_text)}")
-
-                    
-                    result = generate_step(
-                        project_id=project.id,
-                        step_id=step.id,
-                        step_details=step_text
-                    )
-
-                    if not result.get("success"):
-                        any_failed = True
-                        print(f"[ERROR] Step {step.step_number} failed: {result.get('message')}")
-                        
-                        continue
-
-                    
-                    for file_info in result["data"].get("files", []):
-                        folder = (file_info.get("folder") or "").strip().strip("/\\")
-                        filename = (file_info.get("file") or "").strip()
-                        file_code = file_info.get("code", "")
-                        if not filename:
-                            continue
-                        full_path = os.path.join(folder, filename) if folder else filename
-
-                    print(f"[DEBUG] Step {step.step_number} completed; files aggregated: {len(result['data'].get('files', []))}")
-
-                except Exception as e:
-                    any_failed = True
-                    print(f"[ERROR] Unexpected error in step {step_row.step_number}: {e}")
-                    
-                    try:
-                        step = ProjectStep.query.get(step_row.id)
-                        if step:
-                            step.status = "failed"
-                            if hasattr(step, "updated_at"):
-                                step.updated_at = datetime.utcnow()
-                            db.session.commit()
-                    except Exception as _e2:
-                        print(f"[ERROR] Failed to mark step as failed: {_e2}")
-
-            
-            project = Project.query.get(project_id)
-            if project:
-                project.status = "failed" if any_failed else "completed"
-                db.session.commit()
-                print(f"[DEBUG] Project marked as {project.status}")
-
-                if project.status == "completed":
-                    try:
-                        print("[DEBUG] Creating project ZIP")
-                        create_project_zip(project.id)
-                        print("[DEBUG] Project ZIP created")
-                    except Exception as zip_e:
-                        print(f"[WARN] ZIP creation failed: {zip_e}")
-
-            
-            try:
-                db.session.remove()
-            except Exception:
-                pass
-
-    app_obj = current_app._get_current_object()
-    threading.Thread(
-        target=background_generation,
-        args=(app_obj, project.id),
-        daemon=True
-    ).start()
-    print("[DEBUG] Background generation thread started")
+    try:
+        queue_position = _dispatch_generation(project.id)
+    except QueueFullError as e:
+        print(f"[WARN] {e}; discarding project {project.id}")
+        ProjectStep.query.filter_by(project_id=project.id).delete()
+        db.session.delete(project)
+        db.session.commit()
+        return _queue_full_response()
+    print(f"[DEBUG] Project {project.id} queued for generation at position {queue_position}")
 
     response = {
         "success": True,
         "project_id": project.id,
         "progress_url": url_for('codegen.progress', project_id=project.id),
+        "queue_position": queue_position,
         "steps": [{
             "id": s.id,
             "step_number": s.step_number,
@@ -239,11 +245,116 @@ def generate_status(project_id):
     return jsonify({
         "project_id": project.id,
         "status": project.status,
+        "queue_position": _queue_position(project.id),
         "steps": steps,
         "zip_url": zip_url
     })
 
 
+@codegen.route('/retry-step/<int:project_id>/<int:step_id>', methods=['POST'])
+@login_required
+def retry_step(project_id, step_id):
+    project = Project.query.get_or_404(project_id)
+    if project.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    steps = ProjectStep.query.filter_by(project_id=project.id).all()
+    step = next((s for s in steps if s.id == step_id), None)
+    if step is None:
+        return jsonify({"success": False, "message": "Step not found"}), 404
+    if step.status != 'failed':
+        return jsonify({"success": False, "message": "Only failed steps can be retried."}), 409
+
+    by_id = {s.id: s for s in steps}
+    waiting = sorted(by_id[d].step_number for d in build_step_graph(steps).get(step.id, set())
+                     if by_id[d].status != 'completed')
+    if waiting:
+        return jsonify({
+            "success": False,
+            "message": f"Step {step.step_number} depends on steps that are not completed: {waiting}"
+        }), 409
+
+    return _requeue(project, [step], step_id=step.id)
+
+
+@codegen.route('/resume/<int:project_id>', methods=['POST'])
+@login_required
+def resume_project(project_id):
+    project = Project.query.get_or_404(project_id)
+    if project.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    remaining = ProjectStep.query.filter(
+        ProjectStep.project_id == project.id,
+        ProjectStep.status != 'completed'
+    ).all()
+    if not remaining:
+        return jsonify({"success": False, "message": "Every step is already completed."}), 409
+
+    return _requeue(project, remaining)
+
+
+@codegen.route('/diff/<int:project_id>/<int:file_id>', methods=['GET'])
+@login_required
+def file_diff(project_id, file_id):
+    project = Project.query.get_or_404(project_id)
+    if project.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized"}), 403
+    code_file = CodeFile.query.filter_by(id=file_id, project_id=project.id).first_or_404()
+
+    to_revision = request.args.get('to', type=int)
+    if to_revision is None:
+        to_revision = code_file.revision or 0
+    from_revision = request.args.get('from', type=int)
+    if from_revision is None:
+        from_revision = max(0, to_revision - 1)
+    try:
+        diff = diff_revisions(code_file, from_revision, to_revision)
+    except LookupError as e:
+        return jsonify({"success": False, "message": str(e)}), 404
+
+    return jsonify({
+        "success": True,
+        "file_id": code_file.id,
+        "from": from_revision,
+        "to": to_revision,
+        "diff": diff
+    })
+
+
+@codegen.route('/rollback/<int:project_id>/<int:step_id>', methods=['POST'])
+@login_required
+def rollback_project(project_id, step_id):
+    project = Project.query.get_or_404(project_id)
+    if project.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized"}), 403
+    if active_job(project.id):
+        return jsonify({
+            "success": False,
+            "message": "This project is already being generated."
+        }), 409
+
+    try:
+        reverted, removed, reset = rollback_to_step(project.id, step_id)
+    except LookupError as e:
+        return jsonify({"success": False, "message": str(e)}), 404
+
+    if reset:
+        project.status = 'failed'
+        db.session.commit()
+    discard_project_artifacts(project.id)
+    print(f"[DEBUG] Project {project.id} rolled back to step {step_id}: {reverted} reverted, {removed} removed, {reset} step(s) reset")
+
+    return jsonify({
+        "success": True,
+        "project_id": project.id,
+        "files_reverted": reverted,
+        "files_removed": removed,
+        "steps_reset": reset,
+        "status": project.status
+    })
+
+
 @codegen.route('/download/<int:project_id>')
 @login_required
 def download_project(project_id):
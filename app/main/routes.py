@@ -3,6 +3,9 @@ from flask_login import login_required, current_user
 from app import db
 from app.models import User, Project
 from app.auth.forms import ProfileForm
+from app.utils.blob_store import preload_blobs
+from sqlalchemy import func
+from sqlalchemy.orm import undefer_group
 from datetime import datetime
 import os
 import zipfile
@@ -25,7 +28,7 @@ def inject_global_vars():
 @main.route('/dashboard')
 @login_required
 def dashboard(): 
-    project_count = Project.query.filter_by(user_id=current_user.id).count()
+    project_count = db.session.query(func.count(Project.id)).filter(Project.user_id == current_user.id).scalar()
 
     
     recent_projects = Project.query.filter_by(user_id=current_user.id)\
@@ -103,7 +106,7 @@ def export_data():
         
         projects_dir = os.path.join(export_dir, 'projects')
         os.makedirs(projects_dir, exist_ok=True)
-        projects = Project.query.filter_by(user_id=current_user.id).all()
+        projects = Project.query.filter_by(user_id=current_user.id).options(undefer_group('prompts')).all()
         
         for project in projects:
             project_dir = os.path.join(projects_dir, f"project_{project.id}")
@@ -125,7 +128,7 @@ def export_data():
             
             files_dir = os.path.join(project_dir, 'files')
             os.makedirs(files_dir, exist_ok=True)
-            for code_file in project.files:
+            for code_file in preload_blobs(project.files):
                 file_path = os.path.join(files_dir, code_file.folder_path, code_file.file_name)
                 os.makedirs(os.path.dirname(file_path), exist_ok=True)
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -13,9 +13,12 @@ class User(UserMixin, db.Model):
     theme = db.Column(db.String(20), default='light')  
     language = db.Column(db.String(10), default='en')  
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_login = db.Column(db.DateTime)
+    last_login = db.orm.column_property(db.Column(db.DateTime), active_history=True)
     projects = db.relationship('Project', backref='owner', lazy=True)
     active = db.Column(db.Boolean, default=True)
+
+    __table_args__ = (db.Index('ix_user_created_at_id', 'created_at', 'id'),)
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
     
@@ -34,14 +37,16 @@ class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     title = db.Column(db.String(255))
-    original_prompt = db.Column(db.Text)
-    improved_prompt = db.Column(db.Text)
-    status = db.Column(db.String(50), default='in-progress')
+    original_prompt = db.orm.deferred(db.Column(db.Text), group='prompts')
+    improved_prompt = db.orm.deferred(db.Column(db.Text), group='prompts')
+    status = db.orm.column_property(db.Column(db.String(50), default='in-progress'), active_history=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     files = db.relationship('CodeFile', backref='project', lazy=True)
     steps = db.relationship('ProjectStep', backref='project', lazy=True)
 
+    __table_args__ = (db.Index('ix_project_created_at_id', 'created_at', 'id'),)
+
 class ProjectStep(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
@@ -49,18 +54,59 @@ class ProjectStep(db.Model):
     title = db.Column(db.String(255))
     details = db.Column(db.Text)
     deliverables = db.Column(db.Text)
+    depends_on = db.Column(db.Text)
     status = db.Column(db.String(50), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class CodeFile(db.Model):
+    __table_args__ = (db.UniqueConstraint('project_id', 'folder_path', 'file_name', name='uq_code_file_path'),)
+
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
     step_id = db.Column(db.Integer, db.ForeignKey('project_step.id'))
     folder_path = db.Column(db.String(255))
     file_name = db.Column(db.String(255))
-    file_content = db.Column(db.Text)
+    content_hash = db.Column(db.String(64), db.ForeignKey('file_blob.content_hash'), index=True)
+    file_size = db.Column(db.Integer, default=0)
+    revision = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def file_content(self):
+        cached = getattr(self, '_content_cache', None)
+        if cached is None or cached[0] != self.content_hash:
+            from app.utils.blob_store import read_blob
+            cached = self._content_cache = (self.content_hash, read_blob(self.content_hash))
+        return cached[1]
+
+    @file_content.setter
+    def file_content(self, text):
+        from app.utils.blob_store import store_blob
+        text = text or ""
+        self.content_hash = store_blob(text)
+        self.file_size = len(text.encode("utf-8"))
+        self._content_cache = (self.content_hash, text)
+
+class CodeFileRevision(db.Model):
+    __table_args__ = (db.UniqueConstraint('code_file_id', 'revision'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    code_file_id = db.Column(db.Integer, db.ForeignKey('code_file.id'), index=True, nullable=False)
+    step_id = db.Column(db.Integer, db.ForeignKey('project_step.id'))
+    revision = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(64), db.ForeignKey('file_blob.content_hash'))
+    delta = db.Column(db.LargeBinary)
+    size = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class FileBlob(db.Model):
+    content_hash = db.Column(db.String(64), primary_key=True)
+    compression = db.Column(db.String(10), default='zlib', nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class AdminActivity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     admin_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -71,6 +117,8 @@ class AdminActivity(db.Model):
     
     admin = db.relationship('User', backref='activities')
 
+    __table_args__ = (db.Index('ix_admin_activity_timestamp_id', 'timestamp', 'id'),)
+
 class FeatureFlag(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
@@ -78,3 +126,73 @@ class FeatureFlag(db.Model):
     is_enabled = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class GenerationJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), index=True)
+    step_id = db.Column(db.Integer, db.ForeignKey('project_step.id'))
+    status = db.Column(db.String(20), default='queued', index=True)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    worker_id = db.Column(db.String(128))
+    lease_expires_at = db.Column(db.DateTime, index=True)
+    heartbeat_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    project = db.relationship('Project', backref=db.backref('jobs', lazy=True))
+
+class IntentCacheEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    prompt_hash = db.Column(db.String(64), unique=True, index=True, nullable=False)
+    normalized_prompt = db.Column(db.Text)
+    is_code_related = db.Column(db.Boolean, default=False)
+    reason = db.Column(db.String(255))
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PlanCacheEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    prompt_hash = db.Column(db.String(64), unique=True, index=True, nullable=False)
+    normalized_prompt = db.Column(db.Text)
+    signature = db.Column(db.Text)
+    plan_json = db.Column(db.Text)
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime)
+
+
+# Admin dashboard counters: one DashboardStats row plus a DailyStats row per day, kept
+# current by app.services.stats_service.
+class DashboardStats(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    total_users = db.Column(db.Integer, default=0, nullable=False)
+    total_projects = db.Column(db.Integer, default=0, nullable=False)
+    queued_projects = db.Column(db.Integer, default=0, nullable=False)
+    in_progress_projects = db.Column(db.Integer, default=0, nullable=False)
+    completed_projects = db.Column(db.Integer, default=0, nullable=False)
+    failed_projects = db.Column(db.Integer, default=0, nullable=False)
+    other_projects = db.Column(db.Integer, default=0, nullable=False)
+    reconciled_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DailyStats(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    new_users = db.Column(db.Integer, default=0, nullable=False)
+    active_users = db.Column(db.Integer, default=0, nullable=False)
+    new_projects = db.Column(db.Integer, default=0, nullable=False)
+
+# Counts for listing pages, computed in SQL. Deferred, so they only run when a query asks
+# for them with ``undefer(Project.file_count)``.
+Project.file_count = db.orm.column_property(
+    db.select(db.func.count(CodeFile.id)).where(CodeFile.project_id == Project.id)
+    .correlate_except(CodeFile).scalar_subquery(),
+    deferred=True
+)
+Project.step_count = db.orm.column_property(
+    db.select(db.func.count(ProjectStep.id)).where(ProjectStep.project_id == Project.id)
+    .correlate_except(ProjectStep).scalar_subquery(),
+    deferred=True
+)
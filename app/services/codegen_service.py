@@ -1,40 +1,30 @@
-import google.generativeai as genai
 import json
 import os
-import re
+import time
 from time import sleep
 from datetime import datetime
 from config import config
 from app import db
 from app.models import ProjectStep, CodeFile
+from app.services.file_store import existing_contents, upsert_files
+from app.utils.blob_store import preload_blobs
+from app.utils.code_index import code_index, build_code_context, index_path
+from app.utils.feature_flags import is_feature_enabled
+from app.utils.gemini_client import get_model, DEFAULT_MODEL
+from app.utils.hedging import hedged_call, timed_call
+from app.utils.json_repair import parse_model_json, JSONRecoveryError
+from app.utils.json_stream import FilesArrayStreamParser
+from app.utils.patching import PatchError, apply_file_patch, is_patch
+from app.utils.rate_limiter import UpstreamUnavailable, backoff_delay
+from app.utils.monitoring import (
+    STEP_FIRST_FILE_LATENCY, STEP_CONTEXT_TOKENS, STEP_CONTINUATIONS, PATCH_RESULTS,
+    STEP_VALIDATION_LATENCY, VALIDATION_RESULTS
+)
+from app.utils.token_budget import estimate_tokens, model_budget, split_step, describe_scope
+from app.utils.validation import validate_files
 
 
 
-def _strip_code_fences(s: str) -> str:
-    if not s:
-        return s
-    s = s.strip()
-    if s.startswith("```"):
-        s = s.lstrip("`")
-        first_brace = s.find("{")
-        if first_brace != -1:
-            s = s[first_brace:]
-        s = s.rstrip("`").strip()
-    if s.lower().startswith("json"):
-        s = s[4:].lstrip("\n").lstrip()
-    return s
-
-def _sanitize_json_string(s: str) -> str:
-    if not s:
-        return s
-    s = s.replace("\x00", "")
-    def escape_in_string(m):
-        content = m.group(0)
-        content = re.sub(r'(?<!\\)\\(?![btnfr"\\/])', r'\\\\', content)
-        content = content.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
-        return content
-    return re.sub(r'".*?(?<!\\)"', escape_in_string, s, flags=re.S)
-
 def _extract_text_from_gemini(response):
     try:
         if getattr(response, "text", None):
@@ -54,63 +44,510 @@ def _extract_text_from_gemini(response):
     return ""
 
 def _make_model():
-    genai.configure(api_key=config['default'].GEMINI_API_KEY)
+    return get_model(DEFAULT_MODEL)
+
+def _finish_reason(resp):
     try:
-        model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-        )
-    except TypeError:
-        
-        model = genai.GenerativeModel("gemini-2.5-flash")
-    return model
+        if hasattr(resp, "candidates") and resp.candidates:
+            fr = getattr(resp.candidates[0], "finish_reason", None)
+            if fr is not None:
+                return str(getattr(fr, "name", fr)).upper()
+    except Exception:
+        pass
+    return ""
+
+def _completeness_check(parsed):
+    """``is_valid`` for hedged step calls. Parse results are kept in ``parsed`` by response id
+    so the caller can reuse the one for the winning response instead of parsing it again."""
+    def is_complete(resp):
+        if _finish_reason(resp) == "MAX_TOKENS":
+            return False
+        parsed[id(resp)] = result = _parse_step_response(_extract_text_from_gemini(resp))
+        return _has_files(result[0])
+    return is_complete
 
 def _call_gemini_json(model, prompt_text, use_schema=False):
+    """Returns ``(text, finish_reason, parsed)``; ``parsed`` is the ``_parse_step_response``
+    result when the hedging check already produced it, otherwise None."""
     try:
-        resp = model.generate_content(prompt_text)
+        parsed = {}
+        if _hedging_enabled():
+            # A hedge is a deliberate duplicate, so it must not be coalesced with the call it races.
+            call = getattr(model, "generate_content_alone", model.generate_content)
+            resp = hedged_call('codegen', call, prompt_text, is_valid=_completeness_check(parsed))
+        else:
+            resp = timed_call('codegen', model.generate_content, prompt_text)
         
-        try:
-            if hasattr(resp, "candidates") and resp.candidates:
-                fr = getattr(resp.candidates[0], "finish_reason", None)
-                if str(fr).upper() == "SAFETY":
-                    raise RuntimeError("Gemini blocked by safety.")
-        except Exception:
-            pass
+        finish_reason = _finish_reason(resp)
+        if finish_reason.endswith("SAFETY"):
+            print("[WARN] Gemini blocked the response by safety.")
         txt = _extract_text_from_gemini(resp)
-        return txt or ""
+        return txt or "", finish_reason, parsed.get(id(resp))
+    except UpstreamUnavailable:
+        raise
     except Exception as e:
         print(f"[WARN] _call_gemini_json failed (schema={use_schema}): {e}")
-        return ""
+        return "", "", None
 
 
+def _stream_gemini_text(model, prompt_text):
+    resp = model.generate_content(prompt_text, stream=True)
+    for chunk in resp:
+        txt = _extract_text_from_gemini(chunk)
+        if txt:
+            yield txt
 
-def _filter_relevant_context(step_text, code_context_dict, max_files=10, max_lines_per_file=500):
-    if not code_context_dict:
-        return None
+class StepOutputTruncated(Exception):
 
-    step_lower = step_text.lower()
-    relevant_files = []
+    def __init__(self, message, saved=None, failed=None):
+        super().__init__(message)
+        self.saved = saved or []
+        self.failed = list(failed or [])
 
-    
-    for path in code_context_dict.keys():
-        if os.path.basename(path).lower() in step_lower or os.path.dirname(path).lower() in step_lower:
-            relevant_files.append(path)
+
+def _decode_file_object(obj_text):
+    try:
+        return json.loads(obj_text, strict=False)
+    except json.JSONDecodeError:
+        return parse_model_json(obj_text)
+
+def _resolve_contents(project_id, file_infos, patch_failures=None):
+    """Final content of each file entry as ``{(folder, name): text}``, with edits and diffs applied.
+
+    Entries whose edits do not apply are left out and their paths appended to ``patch_failures``.
+    """
+    entries = []
+    for file_info in file_infos:
+        if not isinstance(file_info, dict):
+            continue
+        folder = (file_info.get('folder') or "").strip().strip("/\\")
+        filename = (file_info.get('file') or "").strip()
+        if filename:
+            entries.append((folder, filename, file_info))
+    if not entries:
+        return {}
+
+    patched = [(folder, filename) for folder, filename, fi in entries if is_patch(fi) and not fi.get('code')]
+    current = existing_contents(project_id, patched) if patched else {}
+
+    contents = {}
+    for folder, filename, file_info in entries:
+        key = (folder, filename)
+        code = file_info.get('code') or ""
+        if is_patch(file_info) and not file_info.get('code'):
+            if key in contents:
+                base = contents[key]
+            elif key in current:
+                base = current[key]
+            else:
+                PATCH_RESULTS.labels('missing_file').inc()
+                print(f"[WARN] Edits for {index_path(folder, filename)} target a file that does not exist")
+                if patch_failures is not None:
+                    patch_failures.append(index_path(folder, filename))
+                continue
+            try:
+                code = apply_file_patch(base or "", file_info)
+            except PatchError as e:
+                PATCH_RESULTS.labels('failed').inc()
+                print(f"[WARN] Could not apply edits to {index_path(folder, filename)}: {e}")
+                if patch_failures is not None:
+                    patch_failures.append(index_path(folder, filename))
+                continue
+            PATCH_RESULTS.labels('applied').inc()
+        contents[key] = code
+    return contents
+
+def _persist_files(project_id, step_id, temp_dir, file_infos, patch_failures=None):
+    """Apply and save a batch of file entries. Returns the ``{"folder", "file"}`` entries that were saved.
+
+    Existing files are looked up in one query and every file of the batch is written with one
+    upsert, so the cost per step does not grow with the size of the ``code_file`` table.
+    """
+    contents = _resolve_contents(project_id, file_infos, patch_failures)
+    if not contents:
+        return []
+    upsert_files(project_id, step_id, contents)
+
+    for (folder, filename), code in contents.items():
+        file_path = os.path.join(temp_dir, folder, filename) if folder else os.path.join(temp_dir, filename)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(code)
+        code_index.record(project_id, index_path(folder, filename), code)
+    return [{"folder": folder, "file": filename} for folder, filename in contents]
+
+def _persist_file(project_id, step_id, temp_dir, file_info, patch_failures=None):
+    return bool(_persist_files(project_id, step_id, temp_dir, [file_info], patch_failures))
+
+def _generate_step_streaming(model, prompt, project_id, step, patch_failures=None):
+    temp_dir = os.path.join(config['default'].TEMP_PROJECTS_DIR, f"project_{project_id}")
+    os.makedirs(temp_dir, exist_ok=True)
+
+    parser = FilesArrayStreamParser(decode=_decode_file_object)
+    saved = []
+    started = time.time()
+    peak_buffer = 0
+
+    for chunk in _stream_gemini_text(model, prompt):
+        for file_info in parser.feed(chunk):
+            if not _persist_file(project_id, step.id, temp_dir, file_info, patch_failures):
+                continue
+            db.session.commit()
+            if not saved:
+                ttff = time.time() - started
+                STEP_FIRST_FILE_LATENCY.observe(ttff)
+                print(f"[DEBUG] Step {step.step_number} first file after {ttff:.2f}s")
+            saved.append({
+                "folder": (file_info.get('folder') or "").strip().strip("/\\"),
+                "file": (file_info.get('file') or "").strip()
+            })
+        peak_buffer = max(peak_buffer, parser.buffered_chars)
+
+    print(f"[DEBUG] Step {step.step_number} streamed {len(saved)} files in {time.time() - started:.2f}s (peak buffer chars={peak_buffer}, bad objects={parser.bad_objects})")
+    if parser.truncated:
+        raise StepOutputTruncated(f"Streamed output for step {step.step_number} stopped mid-JSON", saved, patch_failures)
+    return saved
+
+def _existing_code_context(project_id, step_text, budget_tokens=None):
+    try:
+        context, tokens = build_code_context(project_id, step_text, budget_tokens)
+    except Exception as e:
+        print(f"[WARN] Could not build code context for project {project_id}: {e}")
+        return ""
+    STEP_CONTEXT_TOKENS.observe(tokens)
+    return context
+
+def _build_step_prompt(project_id, step_text, budget, scope_text=None):
+    patch_mode = _patch_output_enabled()
+    prompt_parts = [
+        "You are a senior AI coding assistant. Your task is to generate code based on the provided step details.",
+        "Implement ONLY the step described in STEP DETAILS as code. Do not summarize or explain.",
+        "Return ONLY valid minified JSON on a single line (no markdown, no code fences, no comments, no trailing commas).",
+        'Schema: {"files":[{"folder":"path/to/folder","file":"filename.ext","code":"<file contents>"}],'
+        '"instructions":["Instruction 1","Instruction 2"]}',
+    ]
+    if patch_mode:
+        prompt_parts.append(
+            'For an EXISTING file, emit {"folder":"...","file":"...","edits":[{"search":"<exact lines from the current file>","replace":"<new lines>"}]} '
+            'instead of "code". Each search must be copied verbatim from the current file and match exactly one place; include just enough lines to be unique.'
+        )
+    prompt_parts += [
+        "Multi-file policy: generate MULTIPLE folders and MULTIPLE files in THIS SINGLE RESPONSE as required by STEP DETAILS. Every file must be fully implemented—do not skip or stub. Paths must be coherent and consistent across the project.",
+        "Emit only new or modified files whose code is final and future-proof (no further edits required), never re-emit unchanged files, and ensure each emitted file is fully complete, compilable, and integrated end-to-end.",
+        "",
+        f"STEP DETAILS:\n{step_text}"
+        ]
+    if scope_text:
+        prompt_parts += ["", scope_text]
+
+    continuation = [
+        "",
+        "CONTINUATION RULES:",
+        "Code for all previous steps has already been generated.",
+        "Now, you must only write the code that comes after the point where the existing code ends.",
+        "You must automatically determine which parts are already complete and which parts are still pending.",
+    ]
+    if patch_mode:
+        continuation += [
+            "Emit only: (1) brand-new folders/files with full code, and (2) search/replace edits for existing files only where changes are required by STEP DETAILS.",
+            "When updating a file, send only the edits (never the whole file); keep APIs/contracts stable unless STEP DETAILS requires changes—then update all impacted call sites.",
+        ]
+    else:
+        continuation += [
+            "Emit only: (1) brand-new folders/files, and (2) full-file replacements only where changes are required by STEP DETAILS.",
+            "When updating a file, output the entire updated file (not a diff) with all imports/types; keep APIs/contracts stable unless STEP DETAILS requires changes—then update all impacted call sites.",
+        ]
+    continuation.append("Return ONLY valid minified JSON as per the Schema.")
+
+    base_tokens = estimate_tokens("\n".join(prompt_parts + continuation))
+    context_budget = min(config['default'].CODE_CONTEXT_TOKEN_BUDGET, budget["input"] - base_tokens)
+    existing_code = _existing_code_context(project_id, step_text, context_budget)
+    if existing_code:
+        prompt_parts += [
+            "",
+            "EXISTING CODE (the files from earlier steps most relevant to this step; others are shown as outlines):",
+            existing_code
+        ]
+
+    prompt = "\n".join(prompt_parts + continuation)
+    prompt_tokens = estimate_tokens(prompt)
+    if prompt_tokens > budget["input"]:
+        raise ValueError(f"Step prompt needs ~{prompt_tokens} tokens, over the {budget['input']} token input budget of {budget['model']}")
+    return prompt, prompt_tokens
+
+def _save_raw_output(project_id, step, raw_code, suffix=""):
+    temp_dir = os.path.join(config['default'].TEMP_PROJECTS_DIR, f"project_{project_id}")
+    os.makedirs(temp_dir, exist_ok=True)
+    file_name = f"step_{step.step_number}{suffix}_raw.txt"
+    with open(os.path.join(temp_dir, file_name), "w", encoding="utf-8") as f:
+        f.write(raw_code)
+    upsert_files(project_id, step.id, {("", file_name): raw_code})
+    db.session.commit()
+
+def _generate_files(model, prompt, project_id, step, raw_suffix=""):
+    """Run one generation request and persist its files. Returns the response data."""
+    patch_failures = []
+    data = _generate_files_once(model, prompt, project_id, step, raw_suffix, patch_failures)
+    if data.get("streamed") and data.get("files"):
+        _validate_streamed_files(model, prompt, project_id, step, data["files"])
+    if not patch_failures:
+        return data
+
+    print(f"[WARN] Requesting full contents for {len(patch_failures)} file(s) whose edits did not apply: {patch_failures}")
+    fallback_failures = []
+    fallback_prompt = _full_file_prompt(prompt, patch_failures)
+    fallback = _generate_files_once(model, fallback_prompt, project_id, step, raw_suffix, fallback_failures)
+    if fallback.get("streamed") and fallback.get("files"):
+        _validate_streamed_files(model, fallback_prompt, project_id, step, fallback["files"])
+    if fallback_failures:
+        raise ValueError(f"Could not update {fallback_failures}: edits did not apply and no full file was returned")
+    PATCH_RESULTS.labels('full_file_fallback').inc(len(patch_failures))
+    return dict(data, files=list(data.get("files") or []) + list(fallback.get("files") or []))
+
+def _full_file_prompt(prompt, paths):
+    return "\n".join([
+        prompt,
+        "",
+        "FULL FILE FALLBACK:",
+        "The edits you sent for these existing files could not be applied to their current content: " + ", ".join(paths),
+        'Emit ONLY these files, each with its complete final content in "code" (no "edits", no "diff"). Every other file is already saved.'
+    ])
+
+def _generate_files_once(model, prompt, project_id, step, raw_suffix, patch_failures):
+    if _streaming_enabled():
+        try:
+            streamed = _generate_step_streaming(model, prompt, project_id, step, patch_failures)
+        except StepOutputTruncated as e:
+            # The files kept so far are not re-sent by the continuation, so repair them now.
+            if e.saved:
+                _validate_streamed_files(model, prompt, project_id, step, e.saved)
+            raise
+        except Exception as e:
+            db.session.rollback()
+            # The stream broke off, so files it never delivered are unknown; redo the whole
+            # step buffered, which re-sends any edits that failed to apply as well.
+            patch_failures.clear()
+            print(f"[WARN] Streaming generation failed for step {step.step_number}: {e}; falling back to buffered call")
+        else:
+            if streamed or patch_failures:
+                return {"files": streamed, "streamed": True}
+            print(f"[WARN] Streaming produced no files for step {step.step_number}; falling back to buffered call")
 
     
-    if not relevant_files:
-        relevant_files = list(code_context_dict.keys())[-max_files:]
+    attempts = [
+        {"schema": False},
+        {"schema": False},
+        {"schema": True},
+    ]
+
+    response_text = ""
+    code_data = None
+    parse_error = None
+    for i, cfg in enumerate(attempts, start=1):
+        print(f"[DEBUG] Gemini call attempt {i} (schema={cfg['schema']}) for step {step.step_number}")
+        response_text, finish_reason, parsed = _call_gemini_json(model, prompt, use_schema=cfg["schema"])
+        code_data, parse_error = parsed or _parse_step_response(response_text)
+        if _has_files(code_data):
+            break
+        if finish_reason == "MAX_TOKENS" or (parse_error is not None and parse_error.truncated):
+            # Re-sending the same prompt would hit the same limit; keep the complete files and let the caller continue.
+            saved = _salvage_truncated(model, prompt, project_id, step, response_text, patch_failures)
+            raise StepOutputTruncated(f"Output for step {step.step_number} was truncated (finish_reason={finish_reason or 'unknown'})", saved, patch_failures)
+        sleep(backoff_delay(i))
+
+    if not response_text or not response_text.strip():
+        raise ValueError("Model returned empty output after retries/repair.")
+
+    if code_data is None:
+        if parse_error is not None and parse_error.found_object:
+            raise ValueError(f"Model JSON could not be parsed: {parse_error}")
+
+        print(f"[WARN] JSON parse fail, saving raw for step {step.step_number}")
+        raw_code = response_text.strip()
+        _save_raw_output(project_id, step, raw_code, raw_suffix)
+        return {"files": [], "raw": raw_code}
+
+    if not isinstance(code_data, dict):
+        raise ValueError("Parsed response is not a JSON object.")
 
     
-    reduced_parts = []
-    for path in relevant_files:
-        code = code_context_dict[path]
-        lines = code.splitlines()
-        if len(lines) > max_lines_per_file:
-            head = "\n".join(lines[:max_lines_per_file//2])
-            tail = "\n".join(lines[-max_lines_per_file//2:])
-            code = head + "\n... [FILE_TRUNCATED] ...\n" + tail
-        reduced_parts.append(f"// FILE: {path}\n{code}")
-
-    return "\n\n".join(reduced_parts)
+    files = code_data.get("files", [])
+    if files and not isinstance(files, list):
+        files = [files]
+        code_data["files"] = files
+
+    if not files or not any((fi.get("file") or "").strip() for fi in files):
+        raise ValueError("Model JSON did not include any files.")
+
+    code_data["files"] = _save_checked_files(model, prompt, project_id, step, files, patch_failures)
+    return code_data
+
+def _save_checked_files(model, prompt, project_id, step, files, patch_failures=None):
+    """Apply edits, validate and repair, then save a batch of buffered file entries. Returns the saved entries."""
+    # Apply edits first so patched files are syntax-checked like full ones, as in the streaming path.
+    contents = _resolve_contents(project_id, files, patch_failures)
+    files = [{"folder": folder, "file": name, "code": code} for (folder, name), code in contents.items()]
+    if not files:
+        return []
+    files = _validate_step_files(model, prompt, step, files)
+
+    temp_dir = os.path.join(config['default'].TEMP_PROJECTS_DIR, f"project_{project_id}")
+    os.makedirs(temp_dir, exist_ok=True)
+
+    _persist_files(project_id, step.id, temp_dir, files)
+    db.session.commit()
+    return files
+
+def _file_key(file_info):
+    return index_path((file_info.get('folder') or "").strip().strip("/\\"), (file_info.get('file') or "").strip())
+
+def _repair_prompt(prompt, errors):
+    listing = "\n".join(f"- {path}: {error}" for path, error in sorted(errors.items()))
+    return "\n".join([
+        prompt,
+        "",
+        "SYNTAX REPAIR:",
+        "These files from your response do not parse:",
+        listing,
+        'Emit ONLY these files, each with its complete corrected content in "code". Do not emit any other file.'
+    ])
+
+def _repair_files(model, prompt, errors, step):
+    """Ask the model to fix only the files that failed validation. Returns {path: file_info}."""
+    response_text, _, parsed = _call_gemini_json(model, _repair_prompt(prompt, errors))
+    repaired, _ = parsed or _parse_step_response(response_text)
+    if not _has_files(repaired):
+        print(f"[WARN] Repair request for step {step.step_number} returned no files")
+        return {}
+    candidates = {}
+    for file_info in repaired.get("files") or []:
+        if isinstance(file_info, dict) and file_info.get("code") and _file_key(file_info) in errors:
+            candidates[_file_key(file_info)] = file_info
+    still_broken, _ = validate_files(
+        [(path, fi.get("code")) for path, fi in candidates.items()],
+        config['default'].VALIDATION_WORKERS, config['default'].VALIDATION_PARALLEL_MIN_CHARS
+    )
+    return {path: fi for path, fi in candidates.items() if path not in still_broken}
+
+def _check_files(step, items):
+    errors, seconds = validate_files(
+        items, config['default'].VALIDATION_WORKERS, config['default'].VALIDATION_PARALLEL_MIN_CHARS
+    )
+    STEP_VALIDATION_LATENCY.observe(seconds)
+    print(f"[DEBUG] Step {step.step_number} validated {len(items)} files in {seconds * 1000:.1f}ms ({len(errors)} failed)")
+    if errors:
+        VALIDATION_RESULTS.labels('failed').inc(len(errors))
+    return errors
+
+def _validate_step_files(model, prompt, step, files):
+    """Validate files before they are saved and swap in repaired versions of the broken ones."""
+    items = [(_file_key(fi), fi.get("code")) for fi in files if isinstance(fi, dict) and fi.get("code")]
+    errors = _check_files(step, items)
+    if not errors:
+        return files
+    repaired = _repair_files(model, prompt, errors, step)
+    _count_repairs(errors, repaired)
+    return [repaired.get(_file_key(fi), fi) if isinstance(fi, dict) else fi for fi in files]
+
+def _validate_streamed_files(model, prompt, project_id, step, saved):
+    """Streamed files are saved as they arrive, so they are checked afterwards and overwritten if repaired."""
+    wanted = {_file_key(f) for f in saved}
+    rows = preload_blobs(CodeFile.query.filter_by(project_id=project_id, step_id=step.id).all())
+    items = [(index_path(r.folder_path, r.file_name), r.file_content) for r in rows if index_path(r.folder_path, r.file_name) in wanted]
+    errors = _check_files(step, items)
+    if not errors:
+        return
+    repaired = _repair_files(model, prompt, errors, step)
+    _count_repairs(errors, repaired)
+    temp_dir = os.path.join(config['default'].TEMP_PROJECTS_DIR, f"project_{project_id}")
+    _persist_files(project_id, step.id, temp_dir, list(repaired.values()))
+    db.session.commit()
+
+def _count_repairs(errors, repaired):
+    if repaired:
+        VALIDATION_RESULTS.labels('repaired').inc(len(repaired))
+    unrepaired = sorted(set(errors) - set(repaired))
+    if unrepaired:
+        VALIDATION_RESULTS.labels('unrepaired').inc(len(unrepaired))
+        print(f"[WARN] Saving files that still do not parse: {', '.join(unrepaired)}")
+
+def _salvage_truncated(model, prompt, project_id, step, text, patch_failures=None):
+    parser = FilesArrayStreamParser(decode=_decode_file_object)
+    files = _save_checked_files(model, prompt, project_id, step, parser.feed(text or ""), patch_failures)
+    saved = [{"folder": fi["folder"], "file": fi["file"]} for fi in files]
+    if saved:
+        print(f"[DEBUG] Kept {len(saved)} complete files from truncated output of step {step.step_number}")
+    return saved
+
+def _continuation_prompt(prompt, saved, failed=()):
+    done = ", ".join(index_path(f["folder"], f["file"]) for f in saved)
+    lines = [
+        prompt,
+        "",
+        "CONTINUATION OF A CUT-OFF RESPONSE:",
+        "Your previous response to this request stopped before it was complete. These files were received in full and are already saved; do NOT emit them again: " + done,
+    ]
+    if failed:
+        lines.append('The edits you sent for these existing files could not be applied to their current content; emit each of them again with its complete final content in "code" (no "edits", no "diff"): ' + ", ".join(failed))
+    lines.append("Emit ONLY the files that are still missing, including any file that was cut off, as a new complete JSON object following the same Schema.")
+    return "\n".join(lines)
+
+def _generate_with_continuation(model, prompt, project_id, step, raw_suffix=""):
+    """Generate files, sending continuation requests while the output keeps getting truncated."""
+    saved = []
+    failed = []
+    request = prompt
+    max_continuations = max(0, config['default'].STEP_MAX_CONTINUATIONS)
+    for n in range(max_continuations + 1):
+        try:
+            data = _generate_files(model, request, project_id, step, raw_suffix)
+        except StepOutputTruncated as e:
+            saved.extend(e.saved)
+            # Edits that did not apply leave the old file in place; ask for those files in full.
+            done = {_file_key(f) for f in saved}
+            failed = [p for p in dict.fromkeys(failed + e.failed) if p not in done]
+            if not (e.saved or e.failed) or n == max_continuations:
+                STEP_CONTINUATIONS.labels('gave_up').inc()
+                raise StepOutputTruncated(str(e), saved, failed)
+            STEP_CONTINUATIONS.labels('requested').inc()
+            print(f"[WARN] {e}; requesting the remaining files ({len(saved)} kept so far, {len(failed)} to resend in full)")
+            request = _continuation_prompt(prompt, saved, failed)
+            continue
+        missing = [p for p in failed if p not in {_file_key(f) for f in data.get("files") or []}]
+        if missing:
+            raise ValueError(f"Could not update {missing}: edits did not apply and no full file was returned")
+        if saved:
+            data = dict(data, files=saved + list(data.get("files") or []), continuations=n)
+        return data
+
+def _generate_split(model, project_id, step, step_text, budget, scopes):
+    print(f"[DEBUG] Step {step.step_number} split into {len(scopes)} sub-requests: {[s['folder'] or '.' for s in scopes]}")
+    merged = {"files": [], "instructions": [], "parts": len(scopes)}
+    raws = []
+    for n, scope in enumerate(scopes, start=1):
+        prompt, prompt_tokens = _build_step_prompt(project_id, step_text, budget, describe_scope(scope, n, len(scopes)))
+        print(f"[DEBUG] Prompt -> step {step.step_number} part {n}/{len(scopes)} tokens~{prompt_tokens}")
+        data = _generate_with_continuation(model, prompt, project_id, step, raw_suffix=f"_part{n}")
+        merged["files"].extend(data.get("files") or [])
+        instructions = data.get("instructions")
+        if isinstance(instructions, list):
+            merged["instructions"].extend(instructions)
+        if data.get("raw"):
+            raws.append(data["raw"])
+    if raws:
+        merged["raw"] = "\n\n".join(raws)
+    return merged
+
+def _remaining_scopes(step_text, budget, saved):
+    done = {index_path(f.get("folder"), f.get("file")) for f in saved}
+    scopes = []
+    for scope in split_step(step_text, budget, force=True):
+        if scope["files"]:
+            scope = dict(scope, files=[p for p in scope["files"] if p not in done])
+            if not scope["files"]:
+                continue
+        scopes.append(scope)
+    return scopes
 
 def generate_step(project_id, step_id, step_details):
     step = None
@@ -140,142 +577,22 @@ def generate_step(project_id, step_id, step_details):
                 fallback_bits.append(f"Deliverables: {step.deliverables.strip()}")
             step_text = "\n".join(fallback_bits).strip() or f"Implement step #{step.step_number}"
 
-        prompt_parts = [
-            "You are a senior AI coding assistant. Your task is to generate code based on the provided step details.",
-            "Implement ONLY the step described in STEP DETAILS as code. Do not summarize or explain.",
-            "Return ONLY valid minified JSON on a single line (no markdown, no code fences, no comments, no trailing commas).",
-            'Schema: {"files":[{"folder":"path/to/folder","file":"filename.ext","code":"<file contents>"}],'
-            '"instructions":["Instruction 1","Instruction 2"]}',
-            "Multi-file policy: generate MULTIPLE folders and MULTIPLE files in THIS SINGLE RESPONSE as required by STEP DETAILS. Every file must be fully implemented—do not skip or stub. Paths must be coherent and consistent across the project.",
-            "Emit only new or modified files whose code is final and future-proof (no further edits required), never re-emit unchanged files, and ensure each emitted file is fully complete, compilable, and integrated end-to-end.",
-            "",
-            f"STEP DETAILS:\n{step_text}"
-            ]
-        
-        prompt_parts += [
-            "",
-            "CONTINUATION RULES:",
-            "Code for all previous steps has already been generated.",
-            "Now, you must only write the code that comes after the point where the existing code ends.",
-            "You must automatically determine which parts are already complete and which parts are still pending.",
-            "Emit only: (1) brand-new folders/files, and (2) full-file replacements only where changes are required by STEP DETAILS.",
-            "When updating a file, output the entire updated file (not a diff) with all imports/types; keep APIs/contracts stable unless STEP DETAILS requires changes—then update all impacted call sites.",
-            "Return ONLY valid minified JSON as per the Schema."
-        ]
-
-        prompt = "\n".join(prompt_parts)
-
-        print(f"[DEBUG] Prompt -> step {step.step_number} chars={len(prompt)}")
-
-        
-        attempts = [
-            {"schema": False},
-            {"schema": False},
-            {"schema": True},
-        ]
-
-        response_text = ""
-        for i, cfg in enumerate(attempts, start=1):
-            print(f"[DEBUG] Gemini call attempt {i} (schema={cfg['schema']}) for step {step.step_number}")
-            response_text = _call_gemini_json(model, prompt, use_schema=cfg["schema"])
-            if response_text and _try_quick_json_ok(response_text):
-                break
-            sleep(1.2 * i)  
-
-        if not response_text or not response_text.strip():
-            raise ValueError("Model returned empty output after retries/repair.")
-
-        
-        cleaned = _strip_code_fences(response_text)
-        sanitized = _sanitize_json_string(cleaned)
-
-        code_data = None
-        try:
-            code_data = json.loads(sanitized)
-        except json.JSONDecodeError:
-            first = sanitized.find("{")
-            last = sanitized.rfind("}")
-            if first != -1 and last != -1 and last > first:
-                substring = _sanitize_json_string(sanitized[first:last + 1])
-                code_data = json.loads(substring)
-            else:
-                
-                print(f"[WARN] JSON parse fail, saving raw for step {step.step_number}")
-                raw_code = response_text.strip()
-                temp_dir = os.path.join(config['default'].TEMP_PROJECTS_DIR, f"project_{project_id}")
-                os.makedirs(temp_dir, exist_ok=True)
-                file_path = os.path.join(temp_dir, f"step_{step.step_number}_raw.txt")
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(raw_code)
-                new_file = CodeFile(
-                    project_id=project_id,
-                    step_id=step_id,
-                    folder_path="",
-                    file_name=f"step_{step.step_number}_raw.txt",
-                    file_content=raw_code
-                )
-                db.session.add(new_file)
-                step.status = 'completed'
-                if hasattr(step, "updated_at"):
-                    step.updated_at = datetime.utcnow()
-                db.session.commit()
-                return {"success": True, "data": {"files": [], "raw": raw_code}}
-
-        if not isinstance(code_data, dict):
-            raise ValueError("Parsed response is not a JSON object.")
-
-        
-        files = code_data.get("files", [])
-        if files and not isinstance(files, list):
-            files = [files]
-            code_data["files"] = files
-
-        if not files or not any((fi.get("file") or "").strip() for fi in files):
-            raise ValueError("Model JSON did not include any files.")
-
-        
-        temp_dir = os.path.join(config['default'].TEMP_PROJECTS_DIR, f"project_{project_id}")
-        os.makedirs(temp_dir, exist_ok=True)
-
-        for file_info in files:
-            folder = (file_info.get('folder') or "").strip().strip("/\\")
-            filename = (file_info.get('file') or "").strip()
-            code = file_info.get('code') or ""
-            if not filename:
-                continue
-
-            
-            full_dir = os.path.join(temp_dir, folder) if folder else temp_dir
-            os.makedirs(full_dir, exist_ok=True)
-            file_path = os.path.join(full_dir, filename)
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-            
-            existing = CodeFile.query.filter_by(
-                project_id=project_id,
-                folder_path=folder,
-                file_name=filename
-            ).first()
-
-            if existing:
-                
-                merged_code = (existing.file_content or "") + "\n" + code
-                existing.file_content = merged_code
-                existing.step_id = step_id
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(merged_code)
-            else:
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(code)
-                db.session.add(CodeFile(
-                    project_id=project_id,
-                    step_id=step_id,
-                    folder_path=folder,
-                    file_name=filename,
-                    file_content=code
-                ))
+        budget = model_budget(DEFAULT_MODEL)
+        scopes = split_step(step_text, budget)
+        if scopes:
+            code_data = _generate_split(model, project_id, step, step_text, budget, scopes)
+        else:
+            prompt, prompt_tokens = _build_step_prompt(project_id, step_text, budget)
+            print(f"[DEBUG] Prompt -> step {step.step_number} chars={len(prompt)} tokens~{prompt_tokens} (budget in={budget['input']} out={budget['output']})")
+            try:
+                code_data = _generate_with_continuation(model, prompt, project_id, step)
+            except StepOutputTruncated as e:
+                scopes = _remaining_scopes(step_text, budget, e.saved)
+                if not scopes:
+                    raise ValueError(f"{e}; the step does not name separate folders or files to split on")
+                print(f"[WARN] {e}; splitting the rest of the step")
+                code_data = _generate_split(model, project_id, step, step_text, budget, scopes)
+                code_data["files"] = list(e.saved) + code_data["files"]
 
         step.status = 'completed'
         if hasattr(step, "updated_at"):
@@ -287,6 +604,7 @@ def generate_step(project_id, step_id, step_details):
     except Exception as e:
         print(f"[ERROR] generate_step failed: {e}")
         try:
+            db.session.rollback()
             if step:
                 step.status = 'failed'
                 if hasattr(step, "updated_at"):
@@ -298,16 +616,34 @@ def generate_step(project_id, step_id, step_details):
 
 
 
-def _try_quick_json_ok(s: str) -> bool:
+def _hedging_enabled():
     try:
-        cleaned = _strip_code_fences(s or "")
-        sanitized = _sanitize_json_string(cleaned)
-        obj = json.loads(sanitized)
-        if not isinstance(obj, dict):
-            return False
-        files = obj.get("files", [])
-        if files and not isinstance(files, list):
-            return True  
-        return bool(files)
-    except Exception:
+        return is_feature_enabled('hedged_requests')
+    except Exception as e:
+        print(f"[WARN] Could not read hedged_requests flag: {e}")
+        return False
+
+def _patch_output_enabled():
+    try:
+        return is_feature_enabled('patch_output')
+    except Exception as e:
+        print(f"[WARN] Could not read patch_output flag: {e}")
+        return False
+
+def _streaming_enabled():
+    try:
+        return is_feature_enabled('streaming_generation')
+    except Exception as e:
+        print(f"[WARN] Could not read streaming_generation flag: {e}")
+        return False
+
+def _parse_step_response(text):
+    try:
+        return parse_model_json(text or ""), None
+    except JSONRecoveryError as e:
+        return None, e
+
+def _has_files(obj):
+    if not isinstance(obj, dict):
         return False
+    return bool(obj.get("files"))
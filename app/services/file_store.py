@@ -0,0 +1,85 @@
+from datetime import datetime
+from app import db
+from app.models import CodeFile
+from app.services.revision_service import record_revisions
+from app.utils.blob_store import store_blobs, read_blobs
+from app.utils.upsert import dialect_insert
+
+
+def existing_files(project_id, paths):
+    """Map ``(folder, name)`` to ``(id, content_hash)`` for the project's files among ``paths``, in one query."""
+    wanted = set(paths)
+    if not wanted:
+        return {}
+    names = list({name for _, name in wanted})
+    found = {}
+    for i in range(0, len(names), 500):
+        rows = db.session.query(CodeFile.id, CodeFile.folder_path, CodeFile.file_name, CodeFile.content_hash)\
+            .filter(CodeFile.project_id == project_id, CodeFile.file_name.in_(names[i:i + 500]))
+        for row in rows:
+            key = (row.folder_path or "", row.file_name)
+            if key in wanted:
+                found[key] = (row.id, row.content_hash)
+    return found
+
+def existing_contents(project_id, paths):
+    """Current content of the project's files among ``paths`` as ``{(folder, name): text}``."""
+    found = existing_files(project_id, paths)
+    texts = read_blobs(content_hash for _, content_hash in found.values())
+    return {key: texts.get(content_hash, "") for key, (_, content_hash) in found.items()}
+
+def _expire_loaded(project_id):
+    # Rows were written with Core statements; make ORM instances already in the session reload.
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, CodeFile) and obj.project_id == project_id:
+            db.session.expire(obj)
+
+def upsert_files(project_id, step_id, files):
+    """Insert or update ``{(folder, name): text}`` for one step and record their revisions.
+
+    Contents go to the blob store in one batch and the ``code_file`` rows are written with a
+    single ``INSERT ... ON CONFLICT`` against the ``(project_id, folder_path, file_name)`` index.
+    Returns ``{(folder, name): code_file_id}``.
+    """
+    if not files:
+        return {}
+    keys = list(files)
+    hashes = store_blobs([files[key] for key in keys])
+    now = datetime.utcnow()
+    rows = [{
+        "project_id": project_id,
+        "step_id": step_id,
+        "folder_path": folder,
+        "file_name": name,
+        "content_hash": content_hash,
+        "file_size": len((files[(folder, name)] or "").encode("utf-8")),
+        "revision": 0,
+        "created_at": now,
+    } for (folder, name), content_hash in zip(keys, hashes)]
+
+    insert = dialect_insert(CodeFile)
+    if insert is not None:
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=["project_id", "folder_path", "file_name"],
+            set_={
+                "step_id": insert.excluded.step_id,
+                "content_hash": insert.excluded.content_hash,
+                "file_size": insert.excluded.file_size,
+            }
+        ), rows)
+    else:
+        current = existing_files(project_id, keys)
+        for row in rows:
+            key = (row["folder_path"], row["file_name"])
+            if key in current:
+                db.session.query(CodeFile).filter_by(id=current[key][0]).update({
+                    "step_id": row["step_id"], "content_hash": row["content_hash"], "file_size": row["file_size"]
+                })
+            else:
+                db.session.add(CodeFile(**row))
+        db.session.flush()
+    _expire_loaded(project_id)
+
+    ids = {key: file_id for key, (file_id, _) in existing_files(project_id, keys).items()}
+    record_revisions(step_id, {ids[key]: files[key] for key in keys if key in ids})
+    return ids
@@ -0,0 +1,91 @@
+import queue
+import threading
+from collections import OrderedDict
+from config import config
+from app.utils.monitoring import GENERATION_QUEUE_DEPTH, GENERATION_ACTIVE, GENERATION_REJECTED
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class GenerationExecutor:
+
+    def __init__(self, workers=None, max_queue=None):
+        self._workers = workers
+        self._max_queue = max_queue
+        self._queue = None
+        self._pending = OrderedDict()
+        self._running = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    @property
+    def workers(self):
+        return self._workers or config['default'].GENERATION_WORKERS
+
+    @property
+    def max_queue(self):
+        return self._max_queue or config['default'].GENERATION_QUEUE_SIZE
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._queue is not None:
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker_loop, name=f"generation-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            print(f"[DEBUG] Generation executor started: workers={self.workers} queue={self.max_queue}")
+
+    def is_full(self):
+        self._ensure_started()
+        return self._queue.full()
+
+    def submit(self, project_id, fn, *args, timeout=None):
+        self._ensure_started()
+        with self._lock:
+            self._pending[project_id] = True
+        try:
+            if timeout:
+                self._queue.put((fn, project_id, args), timeout=timeout)
+            else:
+                self._queue.put_nowait((fn, project_id, args))
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(project_id, None)
+            GENERATION_REJECTED.inc()
+            raise QueueFullError(f"Generation queue is full ({self.max_queue} waiting)")
+        GENERATION_QUEUE_DEPTH.set(self._queue.qsize())
+        return self.position(project_id)
+
+    def position(self, project_id):
+        with self._lock:
+            if project_id in self._running:
+                return 0
+            for idx, pid in enumerate(self._pending, start=1):
+                if pid == project_id:
+                    return idx
+        return None
+
+    def _worker_loop(self):
+        while True:
+            fn, project_id, args = self._queue.get()
+            with self._lock:
+                self._pending.pop(project_id, None)
+                self._running.add(project_id)
+            GENERATION_QUEUE_DEPTH.set(self._queue.qsize())
+            GENERATION_ACTIVE.inc()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[ERROR] Generation job for project {project_id} crashed: {e}")
+            finally:
+                with self._lock:
+                    self._running.discard(project_id)
+                GENERATION_ACTIVE.dec()
+                self._queue.task_done()
+
+
+generation_executor = GenerationExecutor()
@@ -0,0 +1,267 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, update
+from config import config
+from app import db
+from app.models import GenerationJob, Project, ProjectStep
+
+
+_process_worker = {"pid": None, "id": None}
+_heartbeats = {}
+_heartbeats_lock = threading.Lock()
+
+
+def make_worker_id(prefix="worker"):
+    return f"{prefix}:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def process_worker_id():
+    if _process_worker["pid"] != os.getpid():
+        _process_worker["pid"] = os.getpid()
+        _process_worker["id"] = make_worker_id("web")
+    return _process_worker["id"]
+
+def _lease_delta():
+    return timedelta(seconds=config['default'].GENERATION_LEASE_SECONDS)
+
+def enqueue_project(project_id, worker_id=None, step_id=None):
+    job = GenerationJob(
+        project_id=project_id,
+        step_id=step_id,
+        status='queued',
+        max_attempts=config['default'].GENERATION_MAX_ATTEMPTS
+    )
+    if worker_id:
+        job.worker_id = worker_id
+        job.lease_expires_at = datetime.utcnow() + _lease_delta()
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def active_job(project_id):
+    return GenerationJob.query.filter(
+        GenerationJob.project_id == project_id,
+        GenerationJob.status.in_(('queued', 'running'))
+    ).first()
+
+def queued_count():
+    return GenerationJob.query.filter_by(status='queued').count()
+
+def queue_position(project_id):
+    job = GenerationJob.query.filter_by(project_id=project_id)\
+        .order_by(GenerationJob.id.desc()).first()
+    if not job:
+        return None
+    if job.status == 'running':
+        return 0
+    if job.status != 'queued':
+        return None
+    ahead = GenerationJob.query.filter(
+        GenerationJob.status == 'queued',
+        GenerationJob.id < job.id
+    ).count()
+    return ahead + 1
+
+def _claimable(now, worker_id=None):
+    queued_owners = [GenerationJob.worker_id.is_(None), GenerationJob.lease_expires_at < now]
+    if worker_id:
+        queued_owners.append(GenerationJob.worker_id == worker_id)
+    return or_(
+        and_(GenerationJob.status == 'queued', or_(*queued_owners)),
+        and_(GenerationJob.status == 'running', GenerationJob.lease_expires_at < now)
+    )
+
+def claim_job(job_id, worker_id):
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(GenerationJob)
+        .where(GenerationJob.id == job_id, _claimable(now, worker_id))
+        .values(
+            status='running',
+            worker_id=worker_id,
+            attempts=GenerationJob.attempts + 1,
+            heartbeat_at=now,
+            lease_expires_at=now + _lease_delta(),
+            updated_at=now
+        )
+    )
+    db.session.commit()
+    if result.rowcount != 1:
+        return None
+    return db.session.get(GenerationJob, job_id)
+
+def _fail_exhausted(now):
+    exhausted = GenerationJob.query.filter(
+        GenerationJob.status == 'running',
+        GenerationJob.lease_expires_at < now,
+        GenerationJob.attempts >= GenerationJob.max_attempts
+    ).all()
+    for job in exhausted:
+        print(f"[WARN] Job {job.id} for project {job.project_id} lost its lease {job.attempts} times; giving up")
+        job.status = 'failed'
+        job.last_error = 'Lease expired too many times'
+        job.lease_expires_at = None
+        project = db.session.get(Project, job.project_id)
+        if project and project.status in ('queued', 'in-progress'):
+            project.status = 'failed'
+    if exhausted:
+        db.session.commit()
+
+def claim_next(worker_id, batch=5):
+    now = datetime.utcnow()
+    _fail_exhausted(now)
+
+    candidates = db.session.query(GenerationJob.id).filter(_claimable(now))\
+        .order_by(GenerationJob.created_at.asc(), GenerationJob.id.asc())\
+        .limit(batch).all()
+
+    for (job_id,) in candidates:
+        job = claim_job(job_id, worker_id)
+        if job:
+            return job
+    return None
+
+def renew_leases(worker_id):
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(GenerationJob)
+        .where(
+            GenerationJob.worker_id == worker_id,
+            GenerationJob.status.in_(('queued', 'running'))
+        )
+        .values(heartbeat_at=now, lease_expires_at=now + _lease_delta())
+    )
+    db.session.commit()
+    return result.rowcount
+
+def finish_job(job_id, worker_id, status, error=None):
+    db.session.execute(
+        update(GenerationJob)
+        .where(GenerationJob.id == job_id, GenerationJob.worker_id == worker_id)
+        .values(status=status, last_error=error, lease_expires_at=None, updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+class LeaseHeartbeat:
+
+    def __init__(self, app, worker_id, interval=None):
+        self.app = app
+        self.worker_id = worker_id
+        self.interval = interval or max(1.0, config['default'].GENERATION_LEASE_SECONDS / 3.0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{worker_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.wait(self.interval):
+                try:
+                    renew_leases(self.worker_id)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[WARN] Lease heartbeat for {self.worker_id} failed: {e}")
+            db.session.remove()
+
+
+def ensure_heartbeat(app, worker_id):
+    with _heartbeats_lock:
+        hb = _heartbeats.get(worker_id)
+        if hb is None:
+            hb = LeaseHeartbeat(app, worker_id).start()
+            _heartbeats[worker_id] = hb
+        return hb
+
+
+class JobLease:
+
+    def __init__(self, job_id, worker_id):
+        self.job_id = job_id
+        self.worker_id = worker_id
+
+    def check(self):
+        owner = db.session.query(GenerationJob.worker_id, GenerationJob.status)\
+            .filter(GenerationJob.id == self.job_id).first()
+        return bool(owner) and owner[0] == self.worker_id and owner[1] == 'running'
+
+
+def execute_claimed_job(app, job_id, project_id, worker_id):
+    from app.services.project_runner import run_project_generation
+
+    print(f"[DEBUG] Worker {worker_id} running job {job_id} (project {project_id})")
+    lease = JobLease(job_id, worker_id)
+    with app.app_context():
+        step_id = db.session.query(GenerationJob.step_id).filter(GenerationJob.id == job_id).scalar()
+        db.session.remove()
+    error = None
+    try:
+        run_project_generation(app, project_id, lease=lease, step_ids=[step_id] if step_id else None)
+    except Exception as e:
+        error = str(e)
+        print(f"[ERROR] Job {job_id} crashed: {e}")
+
+    with app.app_context():
+        if not lease.check():
+            print(f"[WARN] Job {job_id} was taken over by another worker; not finishing it")
+            db.session.remove()
+            return
+        if step_id:
+            step = db.session.get(ProjectStep, step_id)
+            succeeded = step is not None and step.status == 'completed'
+        else:
+            project = db.session.get(Project, project_id)
+            succeeded = project is not None and project.status == 'completed'
+        status = 'completed' if succeeded and not error else 'failed'
+        finish_job(job_id, worker_id, status, error)
+        db.session.remove()
+
+def run_job(app, job_id, worker_id):
+    with app.app_context():
+        job = claim_job(job_id, worker_id)
+        project_id = job.project_id if job else None
+        db.session.remove()
+    if not job:
+        print(f"[DEBUG] Job {job_id} already claimed elsewhere")
+        return
+    execute_claimed_job(app, job_id, project_id, worker_id)
+
+def recover_orphaned_jobs(app, executor, worker_id):
+    from app.services.generation_executor import QueueFullError
+
+    with app.app_context():
+        while not executor.is_full():
+            job = claim_next(worker_id)
+            if not job:
+                break
+            print(f"[WARN] Picking up orphaned job {job.id} for project {job.project_id}")
+            try:
+                executor.submit(job.project_id, execute_claimed_job, app, job.id, job.project_id, worker_id)
+            except QueueFullError:
+                break
+        db.session.remove()
+
+def schedule_job_recovery(app):
+    from app import scheduler, start_scheduler
+    from app.services.generation_executor import generation_executor
+
+    def _recover():
+        worker_id = process_worker_id()
+        ensure_heartbeat(app, worker_id)
+        recover_orphaned_jobs(app, generation_executor, worker_id)
+
+    scheduler.add_job(
+        _recover,
+        'interval',
+        seconds=app.config['GENERATION_LEASE_SECONDS'],
+        id='generation-job-recovery',
+        replace_existing=True
+    )
+    start_scheduler()
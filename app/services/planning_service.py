@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.utils.feature_flags import is_feature_enabled
+from app.utils.intent_cache import intent_cache
+from app.utils.intent_utils import check_code_intent, local_code_intent
+from app.utils.plan_cache import plan_cache
+from app.utils.monitoring import PLANNING_LATENCY, INTENT_DECISIONS
+from app.utils.prompt_improver import generate_plan, fallback_plan, classify_and_plan
+
+
+PARALLEL_FLAG = 'intent_plan_parallel'
+SINGLE_CALL_FLAG = 'intent_plan_single_call'
+
+_plan_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="planner")
+
+
+def planning_mode():
+    try:
+        if is_feature_enabled(SINGLE_CALL_FLAG):
+            return 'single_call'
+        if is_feature_enabled(PARALLEL_FLAG):
+            return 'parallel'
+    except Exception as e:
+        print(f"[WARN] Could not read planning flags: {e}")
+    return 'sequential'
+
+def _in_app_context(app, fn, *args):
+    with app.app_context():
+        return fn(*args)
+
+def _draft_plan(prompt):
+    """``(plan, cacheable)``: a plan from the cache, a freshly generated one, or the error fallback."""
+    cached = plan_cache.lookup(prompt)
+    if cached is not None:
+        return cached, False
+    try:
+        return generate_plan(prompt), True
+    except Exception as e:
+        return fallback_plan(prompt, e), False
+
+def _accept_plan(prompt, drafted):
+    # Only called once the intent check has accepted the prompt, so plans for rejected
+    # prompts never reach the cache.
+    plan, cacheable = drafted
+    if cacheable:
+        plan_cache.store(prompt, plan)
+    return plan
+
+def _sequential(prompt):
+    intent = check_code_intent(prompt)
+    if not intent.get('is_code_related', False):
+        return intent, None
+    return intent, _accept_plan(prompt, _draft_plan(prompt))
+
+def _parallel(prompt):
+    local = local_code_intent(prompt)
+    if local is not None:
+        if not local.get('is_code_related', False):
+            return local, None
+        return local, _accept_plan(prompt, _draft_plan(prompt))
+
+    app = current_app._get_current_object()
+    plan_future = _plan_pool.submit(_in_app_context, app, _draft_plan, prompt)
+    intent = check_code_intent(prompt)
+    if not intent.get('is_code_related', False):
+        if not plan_future.cancel():
+            print("[DEBUG] Intent rejected; discarding the plan generated in parallel")
+        return intent, None
+    return intent, _accept_plan(prompt, plan_future.result())
+
+def _single_call(prompt):
+    known = local_code_intent(prompt)
+    if known is not None and not known.get('is_code_related', False):
+        return known, None
+
+    cached_plan = plan_cache.lookup(prompt)
+    if cached_plan is not None:
+        # A similar cached plan says nothing about this prompt's intent, so it is still checked.
+        intent = known or check_code_intent(prompt)
+        if not intent.get('is_code_related', False):
+            return intent, None
+        return intent, cached_plan
+
+    combined = classify_and_plan(prompt)
+    verdict = combined.get('is_code_related')
+    if not isinstance(verdict, bool) or (verdict and not combined.get('steps')):
+        print(f"[WARN] Single-call planning returned an unusable response; falling back to sequential: {combined.get('error', 'missing keys')}")
+        return _sequential(prompt)
+
+    INTENT_DECISIONS.labels('model').inc()
+    intent = {"is_code_related": verdict, "reason": combined.get('reason', '')}
+    intent_cache.put(prompt, intent)
+    if not verdict:
+        return intent, None
+    plan = {
+        "improved_prompt": combined.get('improved_prompt') or prompt,
+        "steps": combined.get('steps', [])
+    }
+    plan_cache.store(prompt, plan)
+    return intent, plan
+
+def resolve_intent_and_plan(prompt):
+    mode = planning_mode()
+    started = time.time()
+    if mode == 'single_call':
+        intent, plan = _single_call(prompt)
+    elif mode == 'parallel':
+        intent, plan = _parallel(prompt)
+    else:
+        intent, plan = _sequential(prompt)
+    elapsed = time.time() - started
+    PLANNING_LATENCY.labels(mode).observe(elapsed)
+    print(f"[DEBUG] Intent and plan resolved in {elapsed:.2f}s (mode={mode})")
+    return intent, plan
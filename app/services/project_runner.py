@@ -0,0 +1,197 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from config import config
+from app import db
+from app.models import Project, ProjectStep
+from app.services.codegen_service import generate_step
+from app.services.zip_service import create_project_zip, recreate_project_from_db
+from app.utils.code_index import code_index
+
+
+def parse_depends_on(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+    numbers = []
+    for v in value:
+        try:
+            numbers.append(int(v))
+        except (TypeError, ValueError):
+            continue
+    return sorted(set(numbers))
+
+def build_step_graph(steps):
+    by_number = {s.step_number: s.id for s in steps}
+    ordered = sorted(steps, key=lambda s: s.step_number)
+    graph = {}
+    previous = None
+    for s in ordered:
+        declared = parse_depends_on(getattr(s, "depends_on", None))
+        if declared is None:
+            deps = {previous.id} if previous else set()
+        else:
+            deps = {by_number[n] for n in declared if n in by_number and n < s.step_number}
+        graph[s.id] = deps
+        previous = s
+    return graph
+
+def _step_text(step):
+    step_text = (step.details or "").strip()
+    if not step_text:
+        fallback_bits = []
+        if step.title:
+            fallback_bits.append(f"Title: {step.title}")
+        if getattr(step, "deliverables", None):
+            fallback_bits.append(f"Deliverables: {step.deliverables}")
+        step_text = "\n".join(fallback_bits).strip() or f"Implement step #{step.step_number}"
+    return step_text
+
+def _run_step(app, project_id, step_id, total):
+    with app.app_context():
+        try:
+            step = ProjectStep.query.get(step_id)
+            if not step:
+                print(f"[WARN] Step id {step_id} disappeared; skipping")
+                return False
+
+            print(f"[DEBUG] === PIPELINE STEP {step.step_number} / {total}: {step.title} ===")
+            step_text = _step_text(step)
+            print(f"[DEBUG] Step {step.step_number} details length: {len(step_text)}")
+
+            result = generate_step(
+                project_id=project_id,
+                step_id=step.id,
+                step_details=step_text
+            )
+
+            if not result.get("success"):
+                print(f"[ERROR] Step {step.step_number} failed: {result.get('message')}")
+                return False
+
+            print(f"[DEBUG] Step {step.step_number} completed; files aggregated: {len(result['data'].get('files', []))}")
+            return True
+
+        except Exception as e:
+            print(f"[ERROR] Unexpected error in step {step_id}: {e}")
+            try:
+                db.session.rollback()
+                step = ProjectStep.query.get(step_id)
+                if step:
+                    step.status = "failed"
+                    if hasattr(step, "updated_at"):
+                        step.updated_at = datetime.utcnow()
+                    db.session.commit()
+            except Exception as _e2:
+                print(f"[ERROR] Failed to mark step as failed: {_e2}")
+            return False
+        finally:
+            db.session.remove()
+
+def run_project_generation(app, project_id, lease=None, step_ids=None):
+    """Run every step that is not completed yet, or only ``step_ids`` when given.
+
+    Completed steps and their stored files are reused as they are, so a resumed or
+    retried project only spends model calls on the work that is still missing.
+    """
+    with app.app_context():
+        print(f"[DEBUG] Starting background generation for project ID: {project_id}")
+        project = Project.query.get(project_id)
+        if not project:
+            print(f"[DEBUG] Project {project_id} not found")
+            return
+
+        project.status = 'in-progress'
+        db.session.commit()
+
+        steps_local = ProjectStep.query.filter_by(project_id=project.id).order_by(ProjectStep.step_number.asc()).all()
+        print(f"[DEBUG] Number of steps to process: {len(steps_local)}")
+
+        graph = build_step_graph(steps_local)
+        numbers = {s.id: s.step_number for s in steps_local}
+        done = {s.id for s in steps_local if s.status == 'completed'}
+        if done:
+            print(f"[DEBUG] Resuming project {project_id}; {len(done)} step(s) already completed")
+        pending = [s.id for s in steps_local if s.id not in done]
+        if step_ids is not None:
+            wanted = set(step_ids)
+            pending = [step_id for step_id in pending if step_id in wanted]
+            print(f"[DEBUG] Retrying step(s) {[numbers[s] for s in pending]} of project {project_id}")
+        failed = set()
+        total = len(steps_local)
+        concurrency = max(1, config['default'].PROJECT_STEP_CONCURRENCY)
+        db.session.remove()
+
+    lease_lost = False
+    running = {}
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"project-{project_id}") as pool:
+        while pending or running:
+            if not lease_lost and lease is not None:
+                with app.app_context():
+                    lease_lost = not lease.check()
+                    db.session.remove()
+                if lease_lost:
+                    print(f"[WARN] Lease lost for project {project_id}; leaving remaining steps to the new owner")
+
+            if not lease_lost:
+                for step_id in list(pending):
+                    if len(running) >= concurrency:
+                        break
+                    deps = graph.get(step_id, set())
+                    if deps & failed:
+                        continue
+                    if deps <= done:
+                        pending.remove(step_id)
+                        running[pool.submit(_run_step, app, project_id, step_id, total)] = step_id
+
+            if not running:
+                break
+
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                step_id = running.pop(future)
+                if future.result():
+                    done.add(step_id)
+                else:
+                    failed.add(step_id)
+
+    code_index.drop(project_id)
+    if lease_lost:
+        return
+
+    blocked = [numbers[s] for s in pending]
+    if blocked:
+        print(f"[WARN] Steps {blocked} were not run because a step they depend on failed")
+
+    with app.app_context():
+        project = Project.query.get(project_id)
+        if project:
+            incomplete = ProjectStep.query.filter(
+                ProjectStep.project_id == project_id,
+                ProjectStep.status != 'completed'
+            ).count()
+            project.status = "failed" if (failed or pending or incomplete) else "completed"
+            db.session.commit()
+            print(f"[DEBUG] Project marked as {project.status}")
+
+            if project.status == "completed":
+                try:
+                    print("[DEBUG] Creating project ZIP")
+                    recreate_project_from_db(project.id)
+                    create_project_zip(project.id)
+                    print("[DEBUG] Project ZIP created")
+                except Exception as zip_e:
+                    print(f"[WARN] ZIP creation failed: {zip_e}")
+
+        try:
+            db.session.remove()
+        except Exception:
+            pass
@@ -0,0 +1,233 @@
+import difflib
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import insert, update
+from config import config
+from app import db
+from app.models import CodeFile, CodeFileRevision, ProjectStep
+from app.utils.blob_store import content_hash, store_blobs, read_blob, read_blobs
+
+
+def _lines(text):
+    return (text or "").splitlines(keepends=True)
+
+def make_delta(old, new):
+    """Encode ``new`` as line ranges copied from ``old`` plus inserted text, zlib-compressed."""
+    a, b = _lines(old), _lines(new)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(b[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"))
+
+def apply_delta(old, delta):
+    a = _lines(old)
+    out = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, list):
+            out.extend(a[op[0]:op[1]])
+        else:
+            out.append(op)
+    return "".join(out)
+
+
+def _history(code_file_id):
+    return CodeFileRevision.query.filter_by(code_file_id=code_file_id)\
+        .order_by(CodeFileRevision.revision.desc())
+
+def _histories(code_file_ids):
+    """Revisions of several files, newest first, loaded in one query."""
+    grouped = {file_id: [] for file_id in code_file_ids}
+    if grouped:
+        for rev in CodeFileRevision.query.filter(CodeFileRevision.code_file_id.in_(list(grouped)))\
+                .order_by(CodeFileRevision.code_file_id, CodeFileRevision.revision.desc()):
+            grouped[rev.code_file_id].append(rev)
+    return grouped
+
+class _RevisionWriter:
+    """Builds revisions for one or more files, reading and writing snapshot blobs in batches."""
+
+    def __init__(self):
+        self.blobs = {}
+        self.snapshots = {}
+        self.created = []
+
+    def preload(self, histories):
+        self.blobs.update(read_blobs(rev.content_hash for history in histories for rev in history if rev.content_hash))
+
+    def text_at(self, history, revision):
+        chain = []
+        for rev in history:
+            if rev.revision > revision.revision:
+                continue
+            chain.append(rev)
+            if rev.delta is None:
+                break
+        if not chain or chain[-1].delta is not None:
+            raise ValueError(f"Revision {revision.revision} of file {revision.code_file_id} has no snapshot to start from")
+        digest = chain[-1].content_hash
+        if digest not in self.blobs:
+            self.blobs[digest] = read_blob(digest)
+        text = self.blobs[digest]
+        for rev in reversed(chain[:-1]):
+            text = apply_delta(text, rev.delta)
+        return text
+
+    def _snapshot(self, rev, text):
+        digest = content_hash(text)
+        self.snapshots[digest] = self.blobs[digest] = text
+        rev.content_hash, rev.delta = digest, None
+
+    def _fill(self, rev, previous, history, text):
+        interval = max(1, config['default'].REVISION_SNAPSHOT_INTERVAL)
+        rev.size = len(text.encode("utf-8"))
+        if previous is None or (rev.revision - 1) % interval == 0:
+            self._snapshot(rev, text)
+        else:
+            rev.content_hash = None
+            rev.delta = make_delta(self.text_at(history, previous), text)
+
+    def _prune(self, history):
+        keep = config['default'].REVISION_MAX_PER_FILE
+        if keep <= 0 or len(history) <= keep:
+            return
+        oldest = history[keep - 1]
+        if oldest.delta is not None:
+            self._snapshot(oldest, self.text_at(history, oldest))
+        for rev in history[keep:]:
+            db.session.delete(rev)
+        del history[keep:]
+
+    def record(self, history, code_file_id, step_id, text):
+        latest = history[0] if history else None
+        if latest is not None and step_id is not None and latest.step_id == step_id:
+            self._fill(latest, history[1] if len(history) > 1 else None, history, text)
+            return latest
+        if latest is not None and self.text_at(history, latest) == text:
+            return latest
+
+        rev = CodeFileRevision(
+            code_file_id=code_file_id,
+            step_id=step_id,
+            revision=latest.revision + 1 if latest else 1
+        )
+        self._fill(rev, latest, history, text)
+        self.created.append(rev)
+        history.insert(0, rev)
+        self._prune(history)
+        return rev
+
+    def finish(self):
+        # Blobs first: snapshot revisions reference them by hash.
+        with db.session.no_autoflush:
+            if self.snapshots:
+                store_blobs(list(self.snapshots.values()))
+            if self.created:
+                db.session.execute(insert(CodeFileRevision), [{
+                    "code_file_id": rev.code_file_id,
+                    "step_id": rev.step_id,
+                    "revision": rev.revision,
+                    "content_hash": rev.content_hash,
+                    "delta": rev.delta,
+                    "size": rev.size,
+                    "created_at": datetime.utcnow(),
+                } for rev in self.created])
+
+
+def revision_text(revision):
+    """Rebuild a revision from the nearest snapshot at or before it."""
+    return _RevisionWriter().text_at(_history(revision.code_file_id).all(), revision)
+
+def record_revisions(step_id, contents):
+    """Record each ``{code_file_id: text}`` as the newest revision of that file.
+
+    A step that writes the same file again (continuations, repairs) replaces its own
+    revision instead of adding one, so there is one revision per file per step. Histories
+    and snapshot blobs are read with one query each, and new revisions and the
+    ``code_file.revision`` pointers are written with one statement each.
+    """
+    if not contents:
+        return
+    histories = _histories(contents)
+    writer = _RevisionWriter()
+    writer.preload(histories.values())
+    pointers = []
+    for file_id, text in contents.items():
+        rev = writer.record(histories[file_id], file_id, step_id, text or "")
+        pointers.append({"id": file_id, "revision": rev.revision})
+    writer.finish()
+    db.session.execute(update(CodeFile), pointers)
+
+def get_revision(code_file_id, number):
+    return CodeFileRevision.query.filter_by(code_file_id=code_file_id, revision=number).first()
+
+def diff_revisions(code_file, from_revision, to_revision):
+    """Unified diff between two revisions of a file; revision 0 is the empty file."""
+    path = f"{code_file.folder_path}/{code_file.file_name}".lstrip("/")
+    texts = []
+    for number in (from_revision, to_revision):
+        if number == 0:
+            texts.append("")
+            continue
+        rev = get_revision(code_file.id, number)
+        if rev is None:
+            raise LookupError(f"Revision {number} of {path} does not exist")
+        texts.append(revision_text(rev))
+    return "".join(difflib.unified_diff(
+        _lines(texts[0]), _lines(texts[1]),
+        fromfile=f"a/{path}@{from_revision}", tofile=f"b/{path}@{to_revision}"
+    ))
+
+def delete_file_revisions(project_id):
+    ids = db.session.query(CodeFile.id).filter(CodeFile.project_id == project_id)
+    CodeFileRevision.query.filter(CodeFileRevision.code_file_id.in_(ids)).delete(synchronize_session=False)
+
+def rollback_to_step(project_id, step_id):
+    """Return every file of the project to its state after ``step_id``.
+
+    Revisions written by later steps are dropped, files those steps created are removed and
+    the later steps go back to pending so the project can be resumed from there.
+    Returns ``(files_reverted, files_removed, steps_reset)``.
+    """
+    steps = ProjectStep.query.filter_by(project_id=project_id).all()
+    target = next((s for s in steps if s.id == step_id), None)
+    if target is None:
+        raise LookupError(f"Step {step_id} does not belong to project {project_id}")
+    later = {s.id for s in steps if s.step_number > target.step_number}
+
+    reverted = removed = 0
+    for code_file in CodeFile.query.filter_by(project_id=project_id).all():
+        revisions = _history(code_file.id).all()
+        if not revisions:
+            if code_file.step_id in later:
+                db.session.delete(code_file)
+                removed += 1
+            continue
+        if revisions[0].step_id not in later:
+            continue
+        keep = next((rev for rev in revisions if rev.step_id not in later), None)
+        if keep is None:
+            for rev in revisions:
+                db.session.delete(rev)
+            db.session.delete(code_file)
+            removed += 1
+            continue
+        text = _RevisionWriter().text_at(revisions, keep)
+        for rev in revisions:
+            if rev.revision > keep.revision:
+                db.session.delete(rev)
+        code_file.file_content = text
+        code_file.step_id = keep.step_id
+        code_file.revision = keep.revision
+        reverted += 1
+
+    reset = 0
+    for s in steps:
+        if s.id in later and s.status != 'pending':
+            s.status = 'pending'
+            reset += 1
+    db.session.commit()
+    return reverted, removed, reset
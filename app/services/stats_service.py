@@ -0,0 +1,210 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, inspect, insert, select, update
+from config import config
+from app import db
+from app.models import User, Project, DashboardStats, DailyStats
+from app.utils.upsert import dialect_insert
+
+
+STATS_ID = 1
+STATUS_COLUMNS = {
+    'queued': 'queued_projects',
+    'in-progress': 'in_progress_projects',
+    'completed': 'completed_projects',
+    'failed': 'failed_projects',
+}
+DAY_COUNTERS = ('new_users', 'active_users', 'new_projects')
+
+
+def _status_column(status):
+    return STATUS_COLUMNS.get(status or 'in-progress', 'other_projects')
+
+def _day(value):
+    return (value or datetime.utcnow()).date()
+
+def _as_date(value):
+    # SQLite returns date() as text.
+    return datetime.strptime(value, '%Y-%m-%d').date() if isinstance(value, str) else value
+
+def _old_value(obj, attr):
+    # Status and last_login use active history, so the committed value is loaded before a change.
+    history = inspect(obj).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+def _collect(session):
+    """Counter deltas for the users and projects written by one flush."""
+    totals = Counter()
+    days = defaultdict(Counter)
+    for obj in session.new:
+        if isinstance(obj, User):
+            totals['total_users'] += 1
+            days[_day(obj.created_at)]['new_users'] += 1
+            if obj.last_login:
+                days[_day(obj.last_login)]['active_users'] += 1
+        elif isinstance(obj, Project):
+            totals['total_projects'] += 1
+            totals[_status_column(obj.status)] += 1
+            days[_day(obj.created_at)]['new_projects'] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Project) and inspect(obj).attrs.status.history.has_changes():
+            old, new = _status_column(_old_value(obj, 'status')), _status_column(obj.status)
+            if old != new:
+                totals[old] -= 1
+                totals[new] += 1
+        elif isinstance(obj, User) and inspect(obj).attrs.last_login.history.has_changes():
+            previous, current = _old_value(obj, 'last_login'), obj.last_login
+            # Only the first login of a day counts towards that day's active users.
+            if current and (previous is None or previous.date() < current.date()):
+                days[current.date()]['active_users'] += 1
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            totals['total_users'] -= 1
+        elif isinstance(obj, Project):
+            totals['total_projects'] -= 1
+            totals[_status_column(_old_value(obj, 'status'))] -= 1
+    return totals, days
+
+def _bump_totals(connection, totals):
+    values = {key: getattr(DashboardStats, key) + delta for key, delta in totals.items() if delta}
+    if values:
+        connection.execute(update(DashboardStats).where(DashboardStats.id == STATS_ID).values(**values))
+
+def _bump_day(connection, day, counts):
+    counts = {key: delta for key, delta in counts.items() if delta}
+    if not counts:
+        return
+    stmt = dialect_insert(DailyStats, connection.dialect.name)
+    if stmt is not None:
+        connection.execute(stmt.values(day=day, **counts).on_conflict_do_update(
+            index_elements=['day'],
+            set_={key: getattr(DailyStats, key) + getattr(stmt.excluded, key) for key in counts}
+        ))
+        return
+    result = connection.execute(update(DailyStats).where(DailyStats.day == day).values(
+        **{key: getattr(DailyStats, key) + delta for key, delta in counts.items()}
+    ))
+    if not result.rowcount:
+        connection.execute(insert(DailyStats).values(day=day, **counts))
+
+def _after_flush(session, _flush_context):
+    totals, days = _collect(session)
+    if not totals and not days:
+        return
+    connection = session.connection()
+    _bump_totals(connection, totals)
+    for day, counts in days.items():
+        _bump_day(connection, day, counts)
+
+def init_dashboard_stats(app):
+    """Keep ``DashboardStats`` and ``DailyStats`` current as users and projects are flushed.
+
+    The counters are updated in the same transaction as the rows they count, so a rollback
+    undoes both. Writes that bypass the ORM (bulk ``Query.delete()``) must call
+    ``discount_projects`` themselves; anything missed is corrected by ``reconcile_stats``.
+    """
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+
+
+def discount_projects(query):
+    """Remove the projects matched by ``query`` from the totals before a bulk delete."""
+    rows = query.with_entities(Project.status, func.count(Project.id)).group_by(Project.status).all()
+    totals = Counter()
+    for status, count in rows:
+        totals['total_projects'] -= count
+        totals[_status_column(status)] -= count
+    _bump_totals(db.session.connection(), totals)
+
+
+def reconcile_stats(now=None):
+    """Recompute the totals and the recent day buckets from the source tables.
+
+    Runs periodically to correct drift from writes the flush hook never saw. Day buckets
+    older than ``STATS_RECONCILE_DAYS`` are left alone. ``active_users`` can only be
+    recounted for today, because ``last_login`` keeps just the latest login.
+    """
+    now = now or datetime.utcnow()
+    today = now.date()
+    since = today - timedelta(days=max(1, config['default'].STATS_RECONCILE_DAYS) - 1)
+    start = datetime.combine(since, datetime.min.time())
+
+    values = {key: 0 for key in set(STATUS_COLUMNS.values()) | {'other_projects'}}
+    values['total_users'] = db.session.execute(select(func.count(User.id))).scalar()
+    values['total_projects'] = 0
+    for status, count in db.session.execute(select(Project.status, func.count(Project.id)).group_by(Project.status)):
+        values[_status_column(status)] += count
+        values['total_projects'] += count
+    values.update(reconciled_at=now, updated_at=now)
+
+    if db.session.get(DashboardStats, STATS_ID) is None:
+        db.session.execute(insert(DashboardStats).values(id=STATS_ID, **values))
+    else:
+        db.session.execute(update(DashboardStats).where(DashboardStats.id == STATS_ID).values(**values))
+
+    buckets = defaultdict(lambda: dict.fromkeys(DAY_COUNTERS, 0))
+    for model, key in ((User, 'new_users'), (Project, 'new_projects')):
+        day = func.date(model.created_at)
+        rows = db.session.execute(select(day, func.count(model.id)).where(model.created_at >= start).group_by(day))
+        for value, count in rows:
+            buckets[_as_date(value)][key] = count
+    today_start = datetime.combine(today, datetime.min.time())
+    buckets[today]['active_users'] = db.session.execute(
+        select(func.count(User.id)).where(User.last_login >= today_start)
+    ).scalar()
+
+    existing = {row.day: row for row in DailyStats.query.filter(DailyStats.day >= since)}
+    for day in set(existing) | set(buckets):
+        counts = buckets[day]
+        row = existing.get(day)
+        if row is None:
+            db.session.add(DailyStats(day=day, **counts))
+            continue
+        row.new_users = counts['new_users']
+        row.new_projects = counts['new_projects']
+        if day == today:
+            row.active_users = counts['active_users']
+    db.session.commit()
+
+
+def current_stats():
+    """The ``DashboardStats`` row, built by a first reconcile if it does not exist yet."""
+    stats = db.session.get(DashboardStats, STATS_ID)
+    if stats is None:
+        reconcile_stats()
+        stats = db.session.get(DashboardStats, STATS_ID)
+    return stats
+
+def status_counts(stats):
+    counts = {status: getattr(stats, column) for status, column in STATUS_COLUMNS.items()}
+    counts['other'] = stats.other_projects
+    return {status: count for status, count in counts.items() if count}
+
+def recent_days(days=7, today=None):
+    """``DailyStats`` for the last ``days`` days (today included) as ``{date: row}``."""
+    today = today or datetime.utcnow().date()
+    rows = DailyStats.query.filter(DailyStats.day > today - timedelta(days=days)).all()
+    return {row.day: row for row in rows}
+
+
+def schedule_stats_reconcile(app):
+    from app import scheduler, start_scheduler
+
+    def _reconcile():
+        with app.app_context():
+            try:
+                reconcile_stats()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[ERROR] Dashboard stats reconcile failed: {e}")
+            finally:
+                db.session.remove()
+
+    scheduler.add_job(
+        _reconcile,
+        'interval',
+        seconds=app.config['STATS_RECONCILE_SECONDS'],
+        id='dashboard-stats-reconcile',
+        replace_existing=True
+    )
+    start_scheduler()
@@ -6,6 +6,7 @@ from datetime import datetime
 from config import config
 from app import db
 from app.models import Project, CodeFile
+from app.utils.blob_store import preload_blobs
 import tempfile
 
 
@@ -50,6 +51,19 @@ def create_project_zip(project_id):
         return {"success": False, "message": str(e)}
 
 
+def discard_project_artifacts(project_id):
+    """Remove the working directory and built ZIPs of a project whose files changed in the database."""
+    shutil.rmtree(os.path.join(config['default'].TEMP_PROJECTS_DIR, f"project_{project_id}"), ignore_errors=True)
+    zip_dir = config['default'].ZIP_DIR
+    if os.path.isdir(zip_dir):
+        for name in os.listdir(zip_dir):
+            if name.startswith(f"project_{project_id}_"):
+                try:
+                    os.remove(os.path.join(zip_dir, name))
+                except OSError as e:
+                    print(f"[WARN] Could not remove {name}: {e}")
+
+
 def recreate_project_from_db(project_id):
     try:
         project = Project.query.get(project_id)
@@ -61,7 +75,7 @@ def recreate_project_from_db(project_id):
         os.makedirs(temp_dir, exist_ok=True)
 
         
-        files = CodeFile.query.filter_by(project_id=project_id).all()
+        files = preload_blobs(CodeFile.query.filter_by(project_id=project_id).all())
 
         for file in files:
             
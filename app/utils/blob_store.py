@@ -0,0 +1,157 @@
+import hashlib
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select
+from config import config
+from app import db
+from app.models import FileBlob, CodeFile, CodeFileRevision
+from app.utils.upsert import dialect_insert
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def content_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+def compress(raw, method=None, level=None):
+    """Compress ``raw`` bytes. Returns ``(method, data)``; small or incompressible input is kept as is."""
+    cfg = config['default']
+    method = method or cfg.BLOB_COMPRESSION
+    level = cfg.BLOB_COMPRESSION_LEVEL if level is None else level
+    if method == "zstd" and zstandard is None:
+        method = "zlib"
+    if method == "zstd":
+        data = zstandard.ZstdCompressor(level=level).compress(raw)
+    elif method == "zlib":
+        data = zlib.compress(raw, level)
+    else:
+        return "none", raw
+    if len(data) >= len(raw):
+        return "none", raw
+    return method, data
+
+def decompress(method, data):
+    if method == "zlib":
+        return zlib.decompress(data)
+    if method == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return bytes(data)
+
+def store_blobs(texts):
+    """Store each text once, compressed, and return their content hashes in order.
+
+    Every blob is written with one statement, so identical boilerplate files share one row.
+    A blob that already exists only has its ``last_used_at`` refreshed. That update locks the
+    row until this transaction commits, and ``prune_unreferenced_blobs`` skips blobs used
+    within ``BLOB_PRUNE_GRACE_SECONDS``, so a blob about to be referenced is never pruned.
+    """
+    texts = [text or "" for text in texts]
+    digests = [content_hash(text) for text in texts]
+    now = datetime.utcnow()
+
+    rows = {}
+    for digest, text in zip(digests, texts):
+        if digest in rows:
+            continue
+        raw = text.encode("utf-8")
+        method, data = compress(raw)
+        rows[digest] = {
+            "content_hash": digest, "compression": method, "size": len(raw), "data": data,
+            "created_at": now, "last_used_at": now,
+        }
+    if not rows:
+        return digests
+    insert = dialect_insert(FileBlob)
+    if insert is not None:
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=["content_hash"], set_={"last_used_at": insert.excluded.last_used_at}
+        ), list(rows.values()))
+        return digests
+
+    unique = list(rows)
+    known = set()
+    for i in range(0, len(unique), 500):
+        known.update(h for (h,) in db.session.query(FileBlob.content_hash)
+                     .filter(FileBlob.content_hash.in_(unique[i:i + 500])))
+    if known:
+        db.session.query(FileBlob).filter(FileBlob.content_hash.in_(known)).update(
+            {FileBlob.last_used_at: now}, synchronize_session=False
+        )
+    db.session.add_all(FileBlob(**row) for digest, row in rows.items() if digest not in known)
+    db.session.flush()
+    return digests
+
+def store_blob(text):
+    return store_blobs([text])[0]
+
+def read_blobs(digests):
+    """Return ``{hash: text}`` for the given hashes, fetched in batches."""
+    digests = list({d for d in digests if d})
+    texts = {}
+    for i in range(0, len(digests), 500):
+        for blob in FileBlob.query.filter(FileBlob.content_hash.in_(digests[i:i + 500])):
+            texts[blob.content_hash] = decompress(blob.compression, blob.data).decode("utf-8")
+    return texts
+
+def read_blob(digest):
+    if not digest:
+        return ""
+    blob = db.session.get(FileBlob, digest)
+    if blob is None:
+        return ""
+    return decompress(blob.compression, blob.data).decode("utf-8")
+
+def preload_blobs(rows):
+    """Fetch the blobs behind ``rows`` in one query so reading ``file_content`` does not query per file."""
+    texts = read_blobs(row.content_hash for row in rows)
+    for row in rows:
+        if row.content_hash in texts:
+            row._content_cache = (row.content_hash, texts[row.content_hash])
+    return rows
+
+def prune_unreferenced_blobs(now=None):
+    """Delete blobs that no file or file revision points at any more. Returns the number removed.
+
+    Blobs used within ``BLOB_PRUNE_GRACE_SECONDS`` are kept even when unreferenced, because the
+    transaction that stored them may not have committed its ``code_file`` rows yet.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=config['default'].BLOB_PRUNE_GRACE_SECONDS)
+    referenced = select(CodeFile.content_hash).where(CodeFile.content_hash.is_not(None))
+    in_history = select(CodeFileRevision.content_hash).where(CodeFileRevision.content_hash.is_not(None))
+    result = db.session.execute(
+        FileBlob.__table__.delete().where(
+            FileBlob.content_hash.not_in(referenced),
+            FileBlob.content_hash.not_in(in_history),
+            or_(FileBlob.last_used_at.is_(None), FileBlob.last_used_at < cutoff)
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def schedule_blob_pruning(app):
+    from app import scheduler, start_scheduler
+
+    def _prune():
+        with app.app_context():
+            try:
+                prune_unreferenced_blobs()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[ERROR] Blob pruning failed: {e}")
+            finally:
+                db.session.remove()
+
+    scheduler.add_job(
+        _prune,
+        'interval',
+        seconds=app.config['BLOB_PRUNE_SECONDS'],
+        id='blob-prune',
+        replace_existing=True
+    )
+    start_scheduler()
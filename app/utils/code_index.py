@@ -0,0 +1,225 @@
+import ast
+import math
+import os
+import re
+import threading
+from collections import Counter
+from config import config
+from app.models import CodeFile
+from app.utils.blob_store import preload_blobs
+
+
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+_RAW_FILE = re.compile(r"^step_\d+_raw\.txt$")
+
+_JS_SYMBOLS = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function\*?|class|const|let|var|interface|type|enum)\s+([A-Za-z_$][\w$]*)",
+    re.M
+)
+_JS_IMPORTS = re.compile(r"""(?:import\s[^'"]*?from\s*|import\s*|require\(\s*)['"]([^'"]+)['"]""")
+_GENERIC_SYMBOLS = re.compile(
+    r"^\s*(?:public\s+|private\s+|protected\s+|static\s+|final\s+|abstract\s+|export\s+)*"
+    r"(?:def|class|func|fn|function|struct|interface|trait|module|type)\s+([A-Za-z_][\w]*)",
+    re.M
+)
+_GENERIC_IMPORTS = re.compile(r"^\s*(?:import|using|use|require|include|#include)\s+[<\"']?([\w./:\-]+)", re.M)
+
+_FIELD_WEIGHTS = {"path": 3.0, "symbol": 2.0, "import": 1.0}
+
+
+def approx_tokens(text):
+    return len(text or "") // 4 + 1
+
+def index_path(folder, filename):
+    folder = (folder or "").strip().strip("/\\")
+    return f"{folder}/{filename}" if folder else filename
+
+def split_terms(text):
+    terms = []
+    for word in _IDENT.findall(text or ""):
+        parts = [p.lower() for p in _CAMEL.findall(word)]
+        terms.extend(p for p in parts if len(p) > 1)
+        if len(parts) > 1:
+            terms.append(word.lower())
+    return terms
+
+def _python_outline(code):
+    symbols, imports = [], []
+    tree = ast.parse(code)
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            symbols.append(node.name)
+        elif isinstance(node, ast.Assign):
+            symbols.extend(t.id for t in node.targets if isinstance(t, ast.Name) and t.id.isupper())
+        elif isinstance(node, ast.Import):
+            imports.extend(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append("." * node.level + (node.module or ""))
+    return symbols, imports
+
+def outline(path, code):
+    ext = os.path.splitext(path)[1].lower()
+    code = code or ""
+    if ext == ".py":
+        try:
+            return _python_outline(code)
+        except (SyntaxError, ValueError):
+            pass
+    if ext in (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs", ".vue", ".svelte"):
+        return _JS_SYMBOLS.findall(code), _JS_IMPORTS.findall(code)
+    return _GENERIC_SYMBOLS.findall(code), _GENERIC_IMPORTS.findall(code)
+
+
+class FileEntry:
+
+    __slots__ = ("path", "symbols", "imports", "terms", "tokens")
+
+    def __init__(self, path, code):
+        self.path = path
+        self.symbols, self.imports = outline(path, code)
+        self.tokens = approx_tokens(code)
+        terms = Counter()
+        for field, values in (("path", [path]), ("symbol", self.symbols), ("import", self.imports)):
+            for value in values:
+                for term in split_terms(value):
+                    terms[term] += _FIELD_WEIGHTS[field]
+        self.terms = terms
+
+    def summary(self):
+        lines = [f"// FILE: {self.path} (outline only)"]
+        if self.symbols:
+            lines.append("// defines: " + ", ".join(self.symbols[:40]))
+        if self.imports:
+            lines.append("// imports: " + ", ".join(self.imports[:20]))
+        return "\n".join(lines)
+
+
+class ProjectCodeIndex:
+
+    def __init__(self, project_id):
+        self.project_id = project_id
+        self._lock = threading.Lock()
+        self._files = {}
+        self._doc_freq = Counter()
+
+    def __len__(self):
+        return len(self._files)
+
+    def add(self, path, code):
+        if not path or _RAW_FILE.match(os.path.basename(path)):
+            return
+        entry = FileEntry(path, code)
+        with self._lock:
+            old = self._files.get(path)
+            if old is not None:
+                self._doc_freq.subtract(old.terms.keys())
+            self._files[path] = entry
+            self._doc_freq.update(entry.terms.keys())
+
+    def rank(self, step_text):
+        query = Counter(split_terms(step_text))
+        text_lower = (step_text or "").lower()
+        with self._lock:
+            total = len(self._files)
+            scored = []
+            for path, entry in self._files.items():
+                score = 0.0
+                for term, qf in query.items():
+                    weight = entry.terms.get(term)
+                    if weight:
+                        idf = math.log(1 + total / (1 + self._doc_freq[term]))
+                        score += idf * weight * (1 + math.log(qf))
+                if os.path.basename(path).lower() in text_lower:
+                    score += 10.0
+                elif path.lower() in text_lower:
+                    score += 10.0
+                scored.append((score, path))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored
+
+    def select(self, step_text, budget_tokens):
+        """Pick files for the prompt: full code while the budget allows, outlines after that."""
+        full, outlines = [], []
+        remaining = budget_tokens
+        ranked = self.rank(step_text)
+        for score, path in ranked:
+            entry = self._files.get(path)
+            if entry is None:
+                continue
+            if score > 0 and entry.tokens <= remaining:
+                full.append(path)
+                remaining -= entry.tokens
+                continue
+            summary_tokens = approx_tokens(entry.summary())
+            if summary_tokens <= remaining:
+                outlines.append(entry)
+                remaining -= summary_tokens
+        return full, outlines
+
+
+class CodeIndexRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def _build(self, project_id):
+        index = ProjectCodeIndex(project_id)
+        rows = preload_blobs(CodeFile.query.filter_by(project_id=project_id).order_by(CodeFile.id.asc()).all())
+        for row in rows:
+            index.add(index_path(row.folder_path, row.file_name), row.file_content)
+        print(f"[DEBUG] Built code index for project {project_id} ({len(index)} files)")
+        return index
+
+    def for_project(self, project_id):
+        with self._lock:
+            index = self._indexes.get(project_id)
+        if index is not None:
+            return index
+        index = self._build(project_id)
+        with self._lock:
+            return self._indexes.setdefault(project_id, index)
+
+    def record(self, project_id, path, code):
+        with self._lock:
+            index = self._indexes.get(project_id)
+        if index is not None:
+            index.add(path, code)
+
+    def drop(self, project_id):
+        with self._lock:
+            self._indexes.pop(project_id, None)
+
+
+code_index = CodeIndexRegistry()
+
+
+def build_code_context(project_id, step_text, budget_tokens=None):
+    """Render the most relevant existing files of a project for a step prompt."""
+    if budget_tokens is None:
+        budget_tokens = config['default'].CODE_CONTEXT_TOKEN_BUDGET
+    index = code_index.for_project(project_id)
+    if not len(index) or budget_tokens <= 0:
+        return "", 0
+
+    full, outlines = index.select(step_text, budget_tokens)
+    parts = []
+    if full:
+        wanted = set(full)
+        ids = [
+            row.id for row in CodeFile.query.with_entities(
+                CodeFile.id, CodeFile.folder_path, CodeFile.file_name
+            ).filter_by(project_id=project_id)
+            if index_path(row.folder_path, row.file_name) in wanted
+        ]
+        contents = {
+            index_path(row.folder_path, row.file_name): row.file_content or ""
+            for row in preload_blobs(CodeFile.query.filter(CodeFile.id.in_(ids)).all())
+        }
+        for path in full:
+            if path in contents:
+                parts.append(f"// FILE: {path}\n{contents[path]}")
+    parts.extend(entry.summary() for entry in outlines)
+    text = "\n\n".join(parts)
+    return text, approx_tokens(text) if text else 0
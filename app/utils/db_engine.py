@@ -0,0 +1,80 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _getter(settings):
+    # Works with the Flask config mapping and with the config classes in config.py.
+    if hasattr(settings, "get"):
+        return settings.get
+    return lambda key, default=None: getattr(settings, key, default)
+
+def profile_for(uri, requested="auto"):
+    """Name of the engine profile to use for ``uri``: ``sqlite``, ``postgres`` or ``none``."""
+    if requested and requested != "auto":
+        return requested
+    backend = make_url(uri).get_backend_name()
+    if backend == "sqlite":
+        return "sqlite"
+    if backend == "postgresql":
+        return "postgres"
+    return "none"
+
+def engine_options(settings):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for the configured profile."""
+    get = _getter(settings)
+    uri = get("SQLALCHEMY_DATABASE_URI")
+    profile = profile_for(uri, get("DB_PROFILE", "auto"))
+
+    if profile == "sqlite":
+        options = {
+            "connect_args": {
+                "timeout": get("DB_BUSY_TIMEOUT", 30),
+                "check_same_thread": False,
+            },
+        }
+        if make_url(uri).database not in (None, "", ":memory:"):
+            options.update(
+                pool_size=get("DB_POOL_SIZE", 10),
+                max_overflow=get("DB_MAX_OVERFLOW", 20),
+                pool_timeout=get("DB_POOL_TIMEOUT", 30),
+            )
+        return options
+    if profile == "postgres":
+        return {
+            "pool_size": get("DB_POOL_SIZE", 10),
+            "max_overflow": get("DB_MAX_OVERFLOW", 20),
+            "pool_timeout": get("DB_POOL_TIMEOUT", 30),
+            "pool_recycle": get("DB_POOL_RECYCLE", 1800),
+            "pool_pre_ping": True,
+        }
+    return {}
+
+def sqlite_pragmas(settings):
+    get = _getter(settings)
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA busy_timeout={int(get('DB_BUSY_TIMEOUT', 30) * 1000)}",
+        f"PRAGMA synchronous={get('DB_SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA cache_size=-{int(get('DB_SQLITE_CACHE_MB', 32) * 1024)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+def configure_engine(engine, settings):
+    """Install per-connection settings for the profile of ``engine``. Returns the profile name."""
+    get = _getter(settings)
+    profile = profile_for(str(engine.url), get("DB_PROFILE", "auto"))
+    if profile != "sqlite":
+        return profile
+
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return profile
@@ -0,0 +1,109 @@
+import json
+import threading
+import google.generativeai as genai
+from config import config
+from app.utils.monitoring import AI_CLIENT_CONFIGURE, AI_CLIENT_LOOKUPS
+from app.utils.rate_limiter import model_guard
+from app.utils.singleflight import model_calls, flight_key
+
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+class GuardedModel:
+    """A GenerativeModel whose calls share the process-wide rate limiter and circuit breaker.
+
+    Plain (non-streaming) prompts are also coalesced: concurrent identical requests for the
+    same model and settings share a single upstream call.
+    """
+
+    def __init__(self, model, model_name, settings_key=None):
+        self._model = model
+        self.model_name = model_name
+        self._settings_key = settings_key
+
+    def generate_content(self, contents, **kwargs):
+        if kwargs:
+            return self.generate_content_alone(contents, **kwargs)
+        key = flight_key(self.model_name, self._settings_key, contents)
+        return model_calls.do(key, self.generate_content_alone, contents)
+
+    def generate_content_alone(self, *args, **kwargs):
+        """Call the model without sharing the request with identical in-flight calls."""
+        return model_guard.call(self.model_name, self._model.generate_content, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+def _freeze(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    try:
+        return json.dumps(value, sort_keys=True, default=str)
+    except TypeError:
+        return repr(value)
+
+
+class GeminiClientRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configured_key = None
+        self._models = {}
+
+    def _ensure_configured(self):
+        api_key = config['default'].GEMINI_API_KEY
+        if self._configured_key == api_key:
+            return
+        with self._lock:
+            if self._configured_key == api_key:
+                return
+            kwargs = {"api_key": api_key}
+            transport = getattr(config['default'], 'GEMINI_TRANSPORT', None)
+            if transport:
+                kwargs["transport"] = transport
+            genai.configure(**kwargs)
+            self._models.clear()
+            self._configured_key = api_key
+            AI_CLIENT_CONFIGURE.inc()
+            print("[DEBUG] Gemini client configured")
+
+    def get_model(self, model_name=DEFAULT_MODEL, generation_config=None, safety_settings=None, system_instruction=None):
+        self._ensure_configured()
+        key = (model_name, _freeze(generation_config), _freeze(safety_settings), system_instruction)
+        model = self._models.get(key)
+        if model is not None:
+            AI_CLIENT_LOOKUPS.labels('hit').inc()
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                kwargs = {"model_name": model_name}
+                if generation_config is not None:
+                    kwargs["generation_config"] = generation_config
+                if safety_settings is not None:
+                    kwargs["safety_settings"] = safety_settings
+                if system_instruction is not None:
+                    kwargs["system_instruction"] = system_instruction
+                try:
+                    model = genai.GenerativeModel(**kwargs)
+                except TypeError:
+                    model = genai.GenerativeModel(model_name)
+                model = GuardedModel(model, model_name, key[1:])
+                self._models[key] = model
+                AI_CLIENT_LOOKUPS.labels('miss').inc()
+                return model
+
+        AI_CLIENT_LOOKUPS.labels('hit').inc()
+        return model
+
+
+registry = GeminiClientRegistry()
+
+
+def get_model(model_name=DEFAULT_MODEL, **settings):
+    return registry.get_model(model_name, **settings)
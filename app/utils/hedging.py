@@ -0,0 +1,127 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config import config
+from app.utils.monitoring import AI_LATENCY, AI_REQUESTS, HEDGED_REQUESTS
+
+
+_call_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="gemini-call")
+
+
+def latency_percentile(model_type, quantile):
+    """Estimate a latency percentile from the AI_LATENCY histogram buckets.
+
+    Returns None until the histogram holds at least HEDGE_MIN_SAMPLES observations.
+    """
+    buckets = []
+    count = 0
+    for metric in AI_LATENCY.collect():
+        for sample in metric.samples:
+            if sample.labels.get('model_type') != model_type:
+                continue
+            if sample.name.endswith('_bucket'):
+                buckets.append((float(sample.labels['le']), sample.value))
+            elif sample.name.endswith('_count'):
+                count = sample.value
+    if count < config['default'].HEDGE_MIN_SAMPLES or not buckets:
+        return None
+
+    buckets.sort()
+    target = quantile * count
+    lower_bound, lower_count = 0.0, 0.0
+    for upper_bound, cumulative in buckets:
+        if cumulative >= target:
+            if math.isinf(upper_bound):
+                return lower_bound
+            if cumulative == lower_count:
+                return upper_bound
+            fraction = (target - lower_count) / (cumulative - lower_count)
+            return lower_bound + (upper_bound - lower_bound) * fraction
+        lower_bound, lower_count = upper_bound, cumulative
+    return lower_bound
+
+
+class HedgeBudget:
+
+    def __init__(self, per_minute=None):
+        self._per_minute = per_minute
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def per_minute(self):
+        if self._per_minute is not None:
+            return self._per_minute
+        return config['default'].HEDGE_MAX_PER_MINUTE
+
+    def try_acquire(self):
+        now = time.time()
+        with self._lock:
+            while self._sent and self._sent[0] <= now - 60:
+                self._sent.popleft()
+            if len(self._sent) >= self.per_minute:
+                return False
+            self._sent.append(now)
+            return True
+
+
+hedge_budget = HedgeBudget()
+
+
+def timed_call(model_type, fn, *args, **kwargs):
+    started = time.time()
+    try:
+        result = fn(*args, **kwargs)
+        AI_REQUESTS.labels(model_type, 'success').inc()
+        return result
+    except Exception:
+        AI_REQUESTS.labels(model_type, 'error').inc()
+        raise
+    finally:
+        AI_LATENCY.labels(model_type).observe(time.time() - started)
+
+def hedged_call(model_type, fn, *args, is_valid=None, **kwargs):
+    """Call ``fn`` and, if it has not answered by the hedge deadline, race a duplicate call.
+
+    The first result accepted by ``is_valid`` wins. The slower call cannot be interrupted
+    mid-request, so its result is simply discarded when it arrives.
+    """
+    is_valid = is_valid or (lambda result: True)
+    deadline = latency_percentile(model_type, config['default'].HEDGE_PERCENTILE)
+    primary = _call_pool.submit(timed_call, model_type, fn, *args, **kwargs)
+    if deadline is None:
+        return primary.result()
+
+    done, _ = wait([primary], timeout=deadline)
+    if done:
+        return primary.result()
+    if not hedge_budget.try_acquire():
+        HEDGED_REQUESTS.labels('capped').inc()
+        return primary.result()
+
+    print(f"[DEBUG] No model response after {deadline:.1f}s; sending a hedged request")
+    HEDGED_REQUESTS.labels('sent').inc()
+    hedge = _call_pool.submit(timed_call, model_type, fn, *args, **kwargs)
+    pending = {primary, hedge}
+    fallback = None
+    error = None
+    while pending:
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            try:
+                result = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if is_valid(result):
+                HEDGED_REQUESTS.labels('won' if future is hedge else 'lost').inc()
+                for other in pending:
+                    other.cancel()
+                return result
+            if fallback is None:
+                fallback = result
+    if fallback is not None:
+        return fallback
+    raise error
@@ -0,0 +1,180 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from config import config
+from app import db
+from app.models import IntentCacheEntry
+
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+
+_STOPWORDS = frozenset("""
+a an the and or but of for to in on at by with from into using use me my i we our you your
+please can could would should will just some any this that these those it its is are be been
+make create build write need want like give show help
+""".split())
+
+# A prompt is only accepted without asking the model when it asks to build something (action),
+# names a concrete technology (tech) and a software artifact. Generic words such as "app" or
+# "database" alone say nothing about intent ("describe my mobile app", "how does a database work").
+_ACTION_TERMS = frozenset("""
+build create write make implement develop code generate scaffold setup set add refactor port
+""".split())
+
+_TECH_TERMS = frozenset("""
+rest graphql sql sqlite postgres postgresql mysql mongodb redis orm crud jwt oauth websocket
+flask django fastapi express node nodejs react vue angular svelte nextjs next.js spring laravel rails
+python javascript typescript java kotlin swift go golang rust c++ c# php ruby html css tailwind bootstrap
+docker kubernetes pytest jest sdk
+""".split())
+
+_ARTIFACT_TERMS = frozenset("""
+api endpoint endpoints backend frontend fullstack full-stack server client database db schema migration
+auth authentication login app application webapp website script cli bot chatbot scraper crawler
+microservice service library package module function class component pipeline tests program
+repository repo dashboard game
+""".split())
+
+_NON_CODE_PATTERNS = [
+    re.compile(p) for p in (
+        r"\b(poem|poetry|haiku|song lyrics|lyrics|short story|novel|essay)\b",
+        r"\b(recipe|cook|bake|ingredients)\b",
+        r"\b(weather|forecast)\b",
+        r"\b(joke|riddle)\b",
+        r"\btranslate\b",
+        r"\b(who is|who was|what is the capital|when did|biography)\b",
+        r"\b(horoscope|zodiac)\b",
+        r"\b(diet plan|workout plan|travel itinerary)\b",
+    )
+]
+
+
+def prompt_terms(prompt):
+    """Content words of ``prompt`` in their original order, duplicates kept."""
+    text = unicodedata.normalize("NFKC", prompt or "").lower()
+    tokens = [t.strip(".-") for t in _TOKEN.findall(text)]
+    return [t for t in tokens if t and t not in _STOPWORDS]
+
+def normalize_prompt(prompt):
+    return " ".join(sorted(set(prompt_terms(prompt))))
+
+def prompt_key(normalized):
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def pre_classify(prompt):
+    text = unicodedata.normalize("NFKC", prompt or "").lower()
+    tokens = {t.strip(".-") for t in _TOKEN.findall(text)}
+    tech_hits = sorted(tokens & _TECH_TERMS)
+    artifact_hits = sorted(tokens & _ARTIFACT_TERMS)
+    non_code = [p.pattern for p in _NON_CODE_PATTERNS if p.search(text)]
+
+    if tokens & _ACTION_TERMS and tech_hits and artifact_hits and not non_code:
+        return {
+            "is_code_related": True,
+            "reason": f"Matched programming terms: {', '.join((tech_hits + artifact_hits)[:5])}"
+        }
+    if non_code and not tech_hits and not artifact_hits:
+        return {
+            "is_code_related": False,
+            "reason": "Request looks like general content, not software"
+        }
+    return None
+
+
+class IntentCache:
+
+    def __init__(self, max_size=None, ttl=None):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    @property
+    def max_size(self):
+        return self._max_size or config['default'].INTENT_CACHE_SIZE
+
+    @property
+    def ttl(self):
+        return self._ttl or config['default'].INTENT_CACHE_TTL
+
+    def _remember(self, key, verdict):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, verdict)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, prompt):
+        key = prompt_key(normalize_prompt(prompt))
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                expires_at, verdict = item
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return dict(verdict)
+                del self._entries[key]
+
+        try:
+            row = IntentCacheEntry.query.filter_by(prompt_hash=key).first()
+            if not row:
+                return None
+            if row.created_at < datetime.utcnow() - timedelta(seconds=self.ttl):
+                return None
+            row.hits = (row.hits or 0) + 1
+            row.last_used_at = datetime.utcnow()
+            db.session.commit()
+            verdict = {"is_code_related": bool(row.is_code_related), "reason": row.reason or ""}
+        except Exception as e:
+            db.session.rollback()
+            print(f"[WARN] Intent cache lookup failed: {e}")
+            return None
+
+        self._remember(key, verdict)
+        return dict(verdict)
+
+    def put(self, prompt, verdict):
+        normalized = normalize_prompt(prompt)
+        key = prompt_key(normalized)
+        clean = {
+            "is_code_related": bool(verdict.get("is_code_related")),
+            "reason": str(verdict.get("reason") or "")[:255]
+        }
+        self._remember(key, clean)
+
+        try:
+            row = IntentCacheEntry.query.filter_by(prompt_hash=key).first()
+            if row is None:
+                row = IntentCacheEntry(prompt_hash=key, normalized_prompt=normalized)
+                db.session.add(row)
+            row.is_code_related = clean["is_code_related"]
+            row.reason = clean["reason"]
+            row.created_at = datetime.utcnow()
+            row.last_used_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[WARN] Intent cache write failed: {e}")
+            return
+
+        self._puts += 1
+        if self._puts % 100 == 0:
+            self.prune()
+
+    def prune(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        try:
+            IntentCacheEntry.query.filter(IntentCacheEntry.created_at < cutoff).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[WARN] Intent cache prune failed: {e}")
+
+
+intent_cache = IntentCache()
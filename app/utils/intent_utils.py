@@ -1,12 +1,35 @@
 
-import google.generativeai as genai
-import json
-from config import config
+from app.utils.gemini_client import get_model
+from app.utils.json_repair import parse_model_json
+from app.utils.intent_cache import intent_cache, pre_classify
+from app.utils.monitoring import INTENT_DECISIONS
+
+def local_code_intent(prompt: str):
+    verdict = pre_classify(prompt)
+    if verdict is not None:
+        INTENT_DECISIONS.labels('heuristic').inc()
+        return verdict
+
+    verdict = intent_cache.get(prompt)
+    if verdict is not None:
+        INTENT_DECISIONS.labels('cache').inc()
+    return verdict
 
 def check_code_intent(prompt: str) -> dict:
+    verdict = local_code_intent(prompt)
+    if verdict is not None:
+        return verdict
+
+    verdict = classify_intent_with_model(prompt)
+    INTENT_DECISIONS.labels('model').inc()
+    if isinstance(verdict.get('is_code_related'), bool) and not verdict.get('error'):
+        intent_cache.put(prompt, verdict)
+    verdict.pop('error', None)
+    return verdict
+
+def classify_intent_with_model(prompt: str) -> dict:
     try:
-        genai.configure(api_key=config['default'].GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = get_model('gemini-2.5-flash')
         
         meta_prompt = (
             "You are a specialized AI intent classifier. "
@@ -17,11 +40,11 @@ def check_code_intent(prompt: str) -> dict:
         )
         
         response = model.generate_content(meta_prompt)
-        response_text = response.text.strip().replace('```json', '').replace('```', '')
-        return json.loads(response_text)
+        return parse_model_json(response.text)
     
     except Exception as e:
         return {
             "is_code_related": False,
-            "reason": f"Error processing intent: {str(e)}"
+            "reason": f"Error processing intent: {str(e)}",
+            "error": True
         }
\ No newline at end of file
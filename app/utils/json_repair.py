@@ -0,0 +1,110 @@
+import json
+import re
+
+
+_OUTSIDE = re.compile(r'["{}\[\],]')
+_INSIDE = re.compile(r'["\\\x00-\x1f]')
+_HEX4 = re.compile(r'[0-9a-fA-F]{4}')
+_VALID_ESCAPES = frozenset('"\\/bfnrt')
+_CTRL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f", "\x00": ""}
+_WS = " \t\r\n"
+
+
+class JSONRecoveryError(ValueError):
+
+    def __init__(self, message, truncated=False, found_object=True):
+        super().__init__(message)
+        self.truncated = truncated
+        self.found_object = found_object
+
+
+def _drop_trailing_comma(out):
+    k = len(out) - 1
+    while k >= 0 and not out[k].strip():
+        k -= 1
+    if k >= 0 and out[k] == ",":
+        out[k] = ""
+
+
+def repair_json_text(text: str) -> str:
+    if not text:
+        raise JSONRecoveryError("Empty model output", found_object=False)
+
+    start = text.find("{")
+    if start == -1:
+        raise JSONRecoveryError("No JSON object in model output", found_object=False)
+
+    n = len(text)
+    out = []
+    pos = start
+    depth = 0
+    in_string = False
+
+    while True:
+        if in_string:
+            m = _INSIDE.search(text, pos)
+            if not m:
+                raise JSONRecoveryError("Model output ends inside a string", truncated=True)
+            i = m.start()
+            ch = text[i]
+            out.append(text[pos:i])
+            if ch == "\\":
+                nxt = text[i + 1:i + 2]
+                if not nxt:
+                    raise JSONRecoveryError("Model output ends inside an escape", truncated=True)
+                if nxt in _VALID_ESCAPES:
+                    out.append(text[i:i + 2])
+                    pos = i + 2
+                elif nxt == "u" and _HEX4.match(text, i + 2):
+                    out.append(text[i:i + 6])
+                    pos = i + 6
+                else:
+                    out.append("\\\\")
+                    pos = i + 1
+            elif ch == '"':
+                j = i + 1
+                while j < n and text[j] in _WS:
+                    j += 1
+
+                if j >= n or text[j] in ",:}]":
+                    out.append('"')
+                    in_string = False
+                else:
+                    out.append('\\"')
+                pos = i + 1
+            else:
+                esc = _CTRL_ESCAPES.get(ch)
+                out.append(esc if esc is not None else "\\u%04x" % ord(ch))
+                pos = i + 1
+        else:
+            m = _OUTSIDE.search(text, pos)
+            if not m:
+                raise JSONRecoveryError("Model output ends before the JSON object closes", truncated=True)
+            i = m.start()
+            ch = text[i]
+            out.append(text[pos:i])
+            pos = i + 1
+            if ch == '"':
+                in_string = True
+                out.append(ch)
+            elif ch in "{[":
+                depth += 1
+                out.append(ch)
+            elif ch in "}]":
+                _drop_trailing_comma(out)
+                out.append(ch)
+                depth -= 1
+                if depth <= 0:
+                    break
+            else:
+                out.append(ch)
+
+    return "".join(out)
+
+
+def parse_model_json(text: str):
+    repaired = repair_json_text(text)
+    try:
+        return json.loads(repaired)
+    except json.JSONDecodeError as e:
+        raise JSONRecoveryError(f"Unrecoverable JSON: {e}") from e
@@ -0,0 +1,112 @@
+import json
+import re
+
+
+_TOKEN = re.compile(r'[\\"{}\[\]]')
+
+
+class FilesArrayStreamParser:
+
+    def __init__(self, key="files", decode=None, max_key_len=64):
+        self.key = key
+        self.decode = decode or (lambda s: json.loads(s, strict=False))
+        self.max_key_len = max_key_len
+        self.files_emitted = 0
+        self.bad_objects = 0
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_start = None
+        self._last_key = None
+        self._array_depth = None
+        self._obj_start = None
+
+    @property
+    def truncated(self):
+        return self._depth > 0 or self._in_string
+
+    @property
+    def buffered_chars(self):
+        return len(self._text)
+
+    def feed(self, chunk):
+        if not chunk:
+            return []
+        self._text += chunk
+        found = []
+        text = self._text
+
+        while True:
+            m = _TOKEN.search(text, self._pos)
+            if not m:
+                self._pos = len(text)
+                break
+            ch = m.group(0)
+            idx = m.start()
+            self._pos = idx + 1
+
+            if self._in_string:
+                if ch == "\\":
+                    self._pos = idx + 2
+                    if self._pos > len(text):
+                        break
+                elif ch == '"':
+                    self._in_string = False
+                    if self._string_start is not None:
+                        raw = text[self._string_start + 1:idx]
+                        if len(raw) <= self.max_key_len:
+                            self._last_key = raw
+                        self._string_start = None
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._array_depth is None:
+                    self._string_start = idx
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._last_key == self.key and self._array_depth is None:
+                    self._array_depth = self._depth
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._obj_start = idx
+            elif ch in "}]":
+                if ch == "}" and self._obj_start is not None and self._depth == self._array_depth + 1:
+                    obj = self._decode_object(text[self._obj_start:idx + 1])
+                    if obj is not None:
+                        found.append(obj)
+                    self._obj_start = None
+                elif ch == "]" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._array_depth = None
+                    self._last_key = None
+                self._depth = max(0, self._depth - 1)
+
+        self._trim()
+        return found
+
+    def _decode_object(self, obj_text):
+        try:
+            obj = self.decode(obj_text)
+        except Exception as e:
+            print(f"[WARN] Streamed file object could not be decoded: {e}")
+            self.bad_objects += 1
+            return None
+        if not isinstance(obj, dict):
+            self.bad_objects += 1
+            return None
+        self.files_emitted += 1
+        return obj
+
+    def _trim(self):
+        keep_from = min(self._pos, len(self._text))
+        for start in (self._obj_start, self._string_start):
+            if start is not None:
+                keep_from = min(keep_from, start)
+        if keep_from <= 0:
+            return
+        self._text = self._text[keep_from:]
+        self._pos -= keep_from
+        if self._obj_start is not None:
+            self._obj_start -= keep_from
+        if self._string_start is not None:
+            self._string_start -= keep_from
@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select, text, tuple_
+from app import db
+
+
+def encode_cursor(values):
+    """Opaque URL-safe token for the sort key of one row."""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token, columns):
+    """Sort key from ``encode_cursor``, or None if the token is malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return tuple(
+            datetime.fromisoformat(v) if column.type.python_type is datetime else column.type.python_type(v)
+            for column, v in zip(columns, values)
+        )
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+def estimated_count(model):
+    """Row count of ``model``'s table from planner statistics, exact when the table is small.
+
+    Postgres reads ``pg_class.reltuples`` and SQLite the ``sqlite_stat1`` row written by
+    ``ANALYZE``; without statistics the highest primary key is used. Below
+    ``KEYSET_EXACT_COUNT_MAX`` rows a real ``COUNT(*)`` is cheap, so that is returned instead.
+    Returns ``(count, is_estimate)``.
+    """
+    table = model.__table__.name
+    dialect = db.session.get_bind().dialect.name
+    estimate = None
+    if dialect == "postgresql":
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}
+        ).scalar()
+    elif dialect == "sqlite":
+        # sqlite_stat1 only exists once ANALYZE has run.
+        analyzed = db.session.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).scalar()
+        if analyzed:
+            stat = db.session.execute(
+                text("SELECT stat FROM sqlite_stat1 WHERE tbl = :t LIMIT 1"), {"t": table}
+            ).scalar()
+            if stat:
+                estimate = int(stat.split()[0])
+    if estimate is None or estimate < 0:
+        estimate = db.session.execute(select(func.max(model.id))).scalar() or 0
+
+    if estimate <= current_app.config.get("KEYSET_EXACT_COUNT_MAX", 10000):
+        return db.session.execute(select(func.count()).select_from(model)).scalar(), False
+    return estimate, True
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing, newest first."""
+
+    def __init__(self, items, per_page, next_cursor, prev_cursor, total, total_is_estimate):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+
+def keyset_paginate(query, columns, after=None, before=None, per_page=20):
+    """Page ``query`` in descending ``columns`` order using a cursor instead of ``OFFSET``.
+
+    ``columns`` must end with a unique column (normally the primary key) and should be
+    covered by a composite index, so every page is an index range scan no matter how deep.
+    ``after`` returns the rows older than that cursor, ``before`` the rows newer than it.
+    """
+    columns = tuple(columns)
+    model = query.column_descriptions[0]["entity"]
+    key = tuple_(*columns)
+    forward = before is None
+    cursor = decode_cursor(after if forward else before, columns)
+    if not forward and cursor is None:
+        forward = True
+
+    if forward:
+        if cursor is not None:
+            query = query.filter(key < tuple_(*cursor))
+        rows = query.order_by(*(c.desc() for c in columns)).limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        has_next, has_prev = more, cursor is not None
+    else:
+        rows = query.filter(key > tuple_(*cursor)).order_by(*(c.asc() for c in columns)).limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_next, has_prev = True, more
+
+    sort_key = lambda row: tuple(getattr(row, c.key) for c in columns)
+    next_cursor = encode_cursor(sort_key(rows[-1])) if rows and has_next else None
+    prev_cursor = encode_cursor(sort_key(rows[0])) if rows and has_prev else None
+    total, is_estimate = estimated_count(model)
+    return KeysetPage(rows, per_page, next_cursor, prev_cursor, total, is_estimate)
@@ -1,6 +1,6 @@
 
 from flask import current_app, request
-from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 import time
 
 
@@ -25,7 +25,123 @@ AI_REQUESTS = Counter(
 AI_LATENCY = Histogram(
     'ai_request_latency_seconds',
     'AI request processing latency',
-    ['model_type']
+    ['model_type'],
+    buckets=(0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300)
+)
+
+HEDGED_REQUESTS = Counter(
+    'ai_hedged_requests_total',
+    'Duplicate model requests sent to cut tail latency, by outcome',
+    ['outcome']
+)
+
+AI_CLIENT_LOOKUPS = Counter(
+    'ai_client_lookups_total',
+    'Gemini model lookups served from the shared client registry',
+    ['result']
+)
+
+AI_CLIENT_CONFIGURE = Counter(
+    'ai_client_configure_total',
+    'Times the Gemini SDK was configured'
+)
+
+MODEL_RATE_LIMIT_WAIT = Histogram(
+    'ai_rate_limit_wait_seconds',
+    'Time a model call waited for a shared rate limit token',
+    buckets=(0, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+)
+
+MODEL_RETRIES = Counter(
+    'ai_model_retries_total',
+    'Model calls retried after an upstream error',
+    ['reason']
+)
+
+CIRCUIT_OPEN = Gauge(
+    'ai_circuit_open',
+    'Whether the circuit breaker for a model is open (1) or closed (0)',
+    ['model']
+)
+
+CIRCUIT_REJECTIONS = Counter(
+    'ai_circuit_rejections_total',
+    'Model calls failed fast because the circuit breaker was open',
+    ['model']
+)
+
+COALESCED_REQUESTS = Counter(
+    'ai_coalesced_requests_total',
+    'Model calls by whether they led an upstream request or shared one already in flight',
+    ['scope', 'role']
+)
+
+INTENT_DECISIONS = Counter(
+    'ai_intent_decisions_total',
+    'Intent classifications by where the verdict came from',
+    ['source']
+)
+
+PLANNING_LATENCY = Histogram(
+    'ai_planning_latency_seconds',
+    'Time to resolve intent and plan before a project is created',
+    ['mode']
+)
+
+PLAN_CACHE_LOOKUPS = Counter(
+    'ai_plan_cache_lookups_total',
+    'Plan cache lookups by result',
+    ['result']
+)
+
+STEP_FIRST_FILE_LATENCY = Histogram(
+    'codegen_step_first_file_seconds',
+    'Time from step request to the first streamed file being saved'
+)
+
+STEP_CONTEXT_TOKENS = Histogram(
+    'codegen_step_context_tokens',
+    'Estimated tokens of existing code included in a step prompt',
+    buckets=(0, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+
+STEP_CONTINUATIONS = Counter(
+    'codegen_step_continuations_total',
+    'Continuation requests sent after truncated step output',
+    ['result']
+)
+
+STEP_VALIDATION_LATENCY = Histogram(
+    'codegen_step_validation_seconds',
+    'Time spent syntax-checking the files of one step',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+VALIDATION_RESULTS = Counter(
+    'codegen_validation_results_total',
+    'Generated files that failed syntax validation, and whether a repair fixed them',
+    ['result']
+)
+
+PATCH_RESULTS = Counter(
+    'codegen_patch_results_total',
+    'Edits to existing files by outcome',
+    ['result']
+)
+
+GENERATION_QUEUE_DEPTH = Gauge(
+    'codegen_queue_depth',
+    'Projects waiting for a generation worker'
+)
+
+GENERATION_ACTIVE = Gauge(
+    'codegen_active_jobs',
+    'Projects currently being generated'
+)
+
+GENERATION_REJECTED = Counter(
+    'codegen_rejected_total',
+    'Generation requests rejected because the queue was full'
 )
 
 def init_request_monitoring(app):
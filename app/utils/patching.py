@@ -0,0 +1,127 @@
+import re
+
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _normalize(line, loose):
+    # Loose matching only forgives trailing whitespace; indentation is part of the match.
+    return line.rstrip() if loose else line
+
+def _block_matches(lines, block, loose):
+    """Every index where ``block`` occurs in ``lines``."""
+    size = len(block)
+    target = [_normalize(b, loose) for b in block]
+    return [
+        i for i in range(len(lines) - size + 1)
+        if _normalize(lines[i], loose) == target[0]
+        and [_normalize(x, loose) for x in lines[i:i + size]] == target
+    ]
+
+def _find_block(lines, block, hint=0, loose=False):
+    """Index where ``block`` occurs in ``lines``, preferring the match closest to ``hint``."""
+    if not block:
+        return None
+    matches = _block_matches(lines, block, loose)
+    if not matches:
+        return None
+    return min(matches, key=lambda i: abs(i - hint))
+
+def _unique_block(lines, block, loose):
+    matches = _block_matches(lines, block, loose)
+    if len(matches) > 1:
+        raise PatchError(f"search text matches {len(matches)} places")
+    return matches[0] if matches else None
+
+def apply_search_replace(content, edits):
+    """Apply ``[{"search": ..., "replace": ...}]`` edits in order.
+
+    Each search must match exactly once, first verbatim and then line by line ignoring
+    trailing whitespace.
+    """
+    if not isinstance(edits, list) or not edits:
+        raise PatchError("no edits given")
+    for n, edit in enumerate(edits, start=1):
+        if not isinstance(edit, dict):
+            raise PatchError(f"edit {n} is not an object")
+        search = edit.get("search")
+        replace = edit.get("replace") or ""
+        if not search:
+            raise PatchError(f"edit {n} has an empty search")
+
+        count = content.count(search)
+        if count == 1:
+            content = content.replace(search, replace, 1)
+            continue
+        if count > 1:
+            raise PatchError(f"edit {n}: search text matches {count} places")
+
+        lines = content.split("\n")
+        block = search.strip("\n").split("\n")
+        start = _unique_block(lines, block, loose=True)
+        if start is None:
+            raise PatchError(f"edit {n}: search text not found")
+        replacement = replace.strip("\n").split("\n") if replace.strip("\n") else []
+        lines[start:start + len(block)] = replacement
+        content = "\n".join(lines)
+    return content
+
+def parse_unified_diff(diff):
+    hunks = []
+    current = None
+    for line in (diff or "").splitlines():
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = {"start": int(header.group(1)), "old": [], "new": []}
+            hunks.append(current)
+            continue
+        if current is None or line.startswith(("---", "+++")) and not current["old"] and not current["new"]:
+            continue
+        if line.startswith("\\"):
+            continue
+        tag, text = (line[:1], line[1:]) if line else (" ", "")
+        if tag == " ":
+            current["old"].append(text)
+            current["new"].append(text)
+        elif tag == "-":
+            current["old"].append(text)
+        elif tag == "+":
+            current["new"].append(text)
+        else:
+            raise PatchError(f"unexpected diff line: {line[:40]!r}")
+    if not hunks:
+        raise PatchError("diff has no hunks")
+    return hunks
+
+def apply_unified_diff(content, diff):
+    """Apply a unified diff, tolerating shifted line numbers and trailing whitespace."""
+    lines = content.split("\n")
+    offset = 0
+    for n, hunk in enumerate(parse_unified_diff(diff), start=1):
+        hint = max(0, hunk["start"] - 1 + offset)
+        if not hunk["old"]:
+            at = min(hint, len(lines))
+        else:
+            at = _find_block(lines, hunk["old"], hint)
+            if at is None:
+                at = _find_block(lines, hunk["old"], hint, loose=True)
+            if at is None:
+                raise PatchError(f"hunk {n} does not match the file")
+        lines[at:at + len(hunk["old"])] = hunk["new"]
+        offset += len(hunk["new"]) - len(hunk["old"])
+    return "\n".join(lines)
+
+def apply_file_patch(content, file_info):
+    """Return the patched content for a file entry that carries ``edits`` or ``diff``."""
+    if file_info.get("edits") is not None:
+        return apply_search_replace(content, file_info["edits"])
+    if file_info.get("diff"):
+        return apply_unified_diff(content, file_info["diff"])
+    raise PatchError("file entry has no edits or diff")
+
+def is_patch(file_info):
+    return file_info.get("edits") is not None or bool(file_info.get("diff"))
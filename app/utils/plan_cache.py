@@ -0,0 +1,198 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from config import config
+from app import db
+from app.models import PlanCacheEntry
+from app.utils.intent_cache import prompt_terms, prompt_key
+from app.utils.monitoring import PLAN_CACHE_LOOKUPS
+
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(8708)
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+
+def term_sequence(prompt):
+    # Word order matters for plans ("Python to JavaScript" is not "JavaScript to Python"),
+    # so unlike the intent cache key the terms are neither sorted nor deduplicated.
+    return " ".join(prompt_terms(prompt))
+
+def shingles(sequence):
+    tokens = sequence.split()
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return grams
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+def minhash(grams):
+    if not grams:
+        return [0] * NUM_PERM
+    hashes = [_hash64(g) for g in grams]
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS]
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / float(len(a | b))
+
+def _bands(signature):
+    for i in range(BANDS):
+        yield (i, tuple(signature[i * ROWS:(i + 1) * ROWS]))
+
+
+class PlanCache:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets = defaultdict(set)
+        self._entries = {}
+        self._loaded_at = 0.0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def threshold(self):
+        return config['default'].PLAN_CACHE_SIMILARITY
+
+    @property
+    def enabled(self):
+        return config['default'].PLAN_CACHE_ENABLED
+
+    def _index(self, entry_id, normalized, signature):
+        self._entries[entry_id] = (normalized, shingles(normalized))
+        for band in _bands(signature):
+            self._buckets[band].add(entry_id)
+
+    def _unindex(self, entry_id):
+        self._entries.pop(entry_id, None)
+        for ids in self._buckets.values():
+            ids.discard(entry_id)
+
+    def _ensure_loaded(self, force=False):
+        if not force and time.time() - self._loaded_at < config['default'].PLAN_CACHE_RELOAD_SECONDS:
+            return
+        rows = db.session.query(
+            PlanCacheEntry.id, PlanCacheEntry.normalized_prompt, PlanCacheEntry.signature
+        ).all()
+        with self._lock:
+            self._buckets = defaultdict(set)
+            self._entries = {}
+            for entry_id, normalized, signature in rows:
+                try:
+                    sig = [int(x) for x in (signature or "").split(",")]
+                except ValueError:
+                    continue
+                if len(sig) == NUM_PERM:
+                    self._index(entry_id, normalized or "", sig)
+            self._loaded_at = time.time()
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+        PLAN_CACHE_LOOKUPS.labels('hit' if hit else 'miss').inc()
+
+    def lookup(self, prompt):
+        if not self.enabled:
+            return None
+        normalized = term_sequence(prompt)
+        if not normalized:
+            return None
+        try:
+            self._ensure_loaded()
+            grams = shingles(normalized)
+            signature = minhash(grams)
+            with self._lock:
+                candidates = set()
+                for band in _bands(signature):
+                    candidates |= self._buckets.get(band, set())
+                scored = sorted(
+                    ((jaccard(grams, self._entries[c][1]), c) for c in candidates if c in self._entries),
+                    reverse=True
+                )
+
+            for similarity, entry_id in scored:
+                if similarity < self.threshold:
+                    break
+                row = db.session.get(PlanCacheEntry, entry_id)
+                if row is None:
+                    with self._lock:
+                        self._unindex(entry_id)
+                    continue
+                row.hits = (row.hits or 0) + 1
+                row.last_hit_at = datetime.utcnow()
+                db.session.commit()
+                self._record(True)
+                print(f"[DEBUG] Plan cache hit (entry {entry_id}, similarity {similarity:.2f})")
+                return json.loads(row.plan_json)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[WARN] Plan cache lookup failed: {e}")
+
+        self._record(False)
+        return None
+
+    def store(self, prompt, plan):
+        if not self.enabled or not plan or not plan.get("steps"):
+            return None
+        normalized = term_sequence(prompt)
+        if not normalized:
+            return None
+        key = prompt_key(normalized)
+        signature = minhash(shingles(normalized))
+        try:
+            row = PlanCacheEntry.query.filter_by(prompt_hash=key).first()
+            if row is None:
+                row = PlanCacheEntry(prompt_hash=key, normalized_prompt=normalized)
+                db.session.add(row)
+            row.signature = ",".join(str(v) for v in signature)
+            row.plan_json = json.dumps(plan, ensure_ascii=False)
+            row.created_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[WARN] Plan cache write failed: {e}")
+            return None
+        with self._lock:
+            self._index(row.id, normalized, signature)
+        return row
+
+    def invalidate(self, entry_id):
+        PlanCacheEntry.query.filter_by(id=entry_id).delete()
+        db.session.commit()
+        with self._lock:
+            self._unindex(entry_id)
+
+    def clear(self):
+        PlanCacheEntry.query.delete()
+        db.session.commit()
+        with self._lock:
+            self._buckets = defaultdict(set)
+            self._entries = {}
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "indexed": len(self._entries),
+                "threshold": self.threshold,
+                "enabled": self.enabled
+            }
+
+
+plan_cache = PlanCache()
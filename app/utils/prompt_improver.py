@@ -1,43 +1,79 @@
 
-import google.generativeai as genai
-import json
-from config import config
+from app.utils.gemini_client import get_model
+from app.utils.json_repair import parse_model_json
+
+PLAN_FORMAT = (
+    '"steps": [{"step_number": 1, "title": "Short title", "details": "Full technical step description", "deliverables": "Expected code deliverables", "depends_on": []}]'
+)
+
+PLAN_REQUIREMENTS = (
+    "\nStrict requirements:\n"
+    "- Language: English only.\n"
+    "- Choose the number of steps based on project complexity. If feasible in one pass, use ONE step that generates MULTIPLE folders and files with their full code. If the project is larger, split into multiple steps; in EVERY step, permit and instruct generating MULTIPLE folders and files with complete code.\n"
+    "- Fill missing requirements with sensible, industry-standard assumptions and state them succinctly in 'details'.\n"
+    "- JSON must be a single object with exactly the keys shown; 'step_number' starts at 1 and increments by 1; no trailing commas; no extra keys; no null/empty values except an empty 'depends_on' list.\n"
+    "- If the request is ambiguous, make pragmatic choices and proceed—do not ask questions.\n"
+    "- For step_number > 1, in 'details', explicitly state that all code from previous steps is already generated and must not be re-emitted. "
+    "Include a concise summary of what was completed in all previous steps before describing the new work for this step.\n"
+    "- Ensure that each subsequent step builds only on what remains pending, continuing seamlessly from the last generated code.\n"
+    "- 'depends_on' lists the step_number values whose code this step needs (only earlier steps). Use an empty list when a step is independent, e.g. backend and frontend scaffolding that do not share files, so independent steps can be generated in parallel."
+)
+
+def generate_plan(prompt: str) -> dict:
+    model = get_model('gemini-2.5-flash')
+
+    meta_prompt = (
+        "You are a senior AI prompt engineer. "
+        "Rewrite the following user request into a rigorous, step-by-step software development execution plan that instructs a coding model to produce CODE ONLY. "
+        "No explanations, no markdown, no commentary, and absolutely no text outside JSON. "
+        "Output ONLY valid JSON in the exact format below (no extra text, no code fences): "
+        '{"improved_prompt": "Detailed rewritten prompt focused only on writing code", '
+        + PLAN_FORMAT + '}'
+        + PLAN_REQUIREMENTS +
+        f"\nUser request: {prompt}"
+    )
+
+    response = model.generate_content(meta_prompt)
+    return parse_model_json(response.text)
+
+def fallback_plan(prompt: str, error) -> dict:
+    return {
+        "improved_prompt": prompt,
+        "steps": [{
+            "step_number": 1,
+            "title": "Error Handling",
+            "details": f"Failed to improve prompt: {str(error)}",
+            "deliverables": "None",
+            "depends_on": []
+        }]
+    }
 
 def improve_prompt(prompt: str) -> dict:
     try:
-        genai.configure(api_key=config['default'].GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
+        return generate_plan(prompt)
+    except Exception as e:
+        return fallback_plan(prompt, e)
+
+def classify_and_plan(prompt: str) -> dict:
+    try:
+        model = get_model('gemini-2.5-flash')
+
         meta_prompt = (
-            "You are a senior AI prompt engineer. "
-            "Rewrite the following user request into a rigorous, step-by-step software development execution plan that instructs a coding model to produce CODE ONLY. "
-            "No explanations, no markdown, no commentary, and absolutely no text outside JSON. "
+            "You are a specialized AI intent classifier and senior AI prompt engineer. "
+            "First decide whether the user request is related to software/code generation. "
+            "If it is, rewrite it into a rigorous, step-by-step software development execution plan that instructs a coding model to produce CODE ONLY. "
+            "If it is not, return an empty 'improved_prompt' and an empty 'steps' list. "
             "Output ONLY valid JSON in the exact format below (no extra text, no code fences): "
-            '{"improved_prompt": "Detailed rewritten prompt focused only on writing code", '
-            '"steps": [{"step_number": 1, "title": "Short title", "details": "Full technical step description", "deliverables": "Expected code deliverables"}]}'
-            "\nStrict requirements:\n"
-            "- Language: English only.\n"
-            "- Choose the number of steps based on project complexity. If feasible in one pass, use ONE step that generates MULTIPLE folders and files with their full code. If the project is larger, split into multiple steps; in EVERY step, permit and instruct generating MULTIPLE folders and files with complete code.\n"
-            "- Fill missing requirements with sensible, industry-standard assumptions and state them succinctly in 'details'.\n"
-            "- JSON must be a single object with exactly the keys shown; 'step_number' starts at 1 and increments by 1; no trailing commas; no extra keys; no null/empty values.\n"
-            "- If the request is ambiguous, make pragmatic choices and proceed—do not ask questions.\n"
-            "- For step_number > 1, in 'details', explicitly state that all code from previous steps is already generated and must not be re-emitted. "
-            "Include a concise summary of what was completed in all previous steps before describing the new work for this step.\n"
-            "- Ensure that each subsequent step builds only on what remains pending, continuing seamlessly from the last generated code."
+            '{"is_code_related": true, "reason": "Short explanation", '
+            '"improved_prompt": "Detailed rewritten prompt focused only on writing code", '
+            + PLAN_FORMAT + '}'
+            + PLAN_REQUIREMENTS +
+            "\n- When 'is_code_related' is false, 'improved_prompt' and 'steps' must be empty."
             f"\nUser request: {prompt}"
         )
 
         response = model.generate_content(meta_prompt)
-        response_text = response.text.strip().replace('```json', '').replace('```', '')
-        return json.loads(response_text)
-    
+        return parse_model_json(response.text)
+
     except Exception as e:
-        return {
-            "improved_prompt": prompt,
-            "steps": [{
-                "step_number": 1,
-                "title": "Error Handling",
-                "details": f"Failed to improve prompt: {str(e)}",
-                "deliverables": "None"
-            }]
-        }
\ No newline at end of file
+        return {"error": f"Failed to classify and plan: {str(e)}"}
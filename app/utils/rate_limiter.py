@@ -0,0 +1,244 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from google.api_core import exceptions as google_exceptions
+from config import config
+from app.utils.monitoring import (
+    MODEL_RATE_LIMIT_WAIT, MODEL_RETRIES, CIRCUIT_OPEN, CIRCUIT_REJECTIONS
+)
+
+
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+)
+QUOTA_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+
+
+class UpstreamUnavailable(RuntimeError):
+    """Raised without calling the model while the circuit breaker is open."""
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    base = config['default'].MODEL_BACKOFF_BASE if base is None else base
+    cap = config['default'].MODEL_BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** max(0, attempt - 1))))
+
+
+class SharedLimiterState:
+    """Token buckets and circuit breakers kept in a small SQLite file.
+
+    Every thread and every process that points at the same file shares the same limits,
+    so several gunicorn workers stay under one quota together.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = set()
+
+    @property
+    def path(self):
+        return self._path or config['default'].MODEL_LIMITS_PATH
+
+    def _conn(self):
+        path = self.path
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "path", None) != path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.path = path
+            with self._init_lock:
+                if path not in self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS token_bucket ("
+                        "name TEXT PRIMARY KEY, tokens REAL NOT NULL, rate REAL NOT NULL, updated_at REAL NOT NULL)"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS circuit_breaker ("
+                        "name TEXT PRIMARY KEY, failures INTEGER NOT NULL DEFAULT 0, "
+                        "opened_until REAL NOT NULL DEFAULT 0, cooldown REAL NOT NULL DEFAULT 0)"
+                    )
+                    self._initialized.add(path)
+        return conn
+
+    def _transaction(self, fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def take_token(self, name, max_rate, burst):
+        """Consume one token. Returns 0 on success, otherwise the seconds until one is available."""
+        def take(conn):
+            now = time.time()
+            row = conn.execute("SELECT tokens, rate, updated_at FROM token_bucket WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                tokens, rate, updated_at = float(burst), float(max_rate), now
+                conn.execute("INSERT INTO token_bucket (name, tokens, rate, updated_at) VALUES (?, ?, ?, ?)",
+                             (name, tokens, rate, now))
+            else:
+                tokens, rate, updated_at = row
+            rate = min(rate, max_rate)
+            tokens = min(float(burst), tokens + (now - updated_at) * rate / 60.0)
+            wait_for = 0.0
+            if tokens >= 1.0:
+                tokens -= 1.0
+            else:
+                wait_for = (1.0 - tokens) * 60.0 / rate
+            conn.execute("UPDATE token_bucket SET tokens = ?, rate = ?, updated_at = ? WHERE name = ?",
+                         (tokens, rate, now, name))
+            return wait_for
+        return self._transaction(take)
+
+    def adjust_rate(self, name, factor=None, increment=None, min_rate=1.0, max_rate=60.0):
+        def adjust(conn):
+            row = conn.execute("SELECT rate FROM token_bucket WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return max_rate
+            rate = row[0]
+            if factor is not None:
+                rate *= factor
+            if increment is not None:
+                rate += increment
+            rate = max(min_rate, min(max_rate, rate))
+            conn.execute("UPDATE token_bucket SET rate = ? WHERE name = ?", (rate, name))
+            return rate
+        return self._transaction(adjust)
+
+    def circuit(self, name):
+        row = self._conn().execute(
+            "SELECT failures, opened_until, cooldown FROM circuit_breaker WHERE name = ?", (name,)
+        ).fetchone()
+        return row or (0, 0.0, 0.0)
+
+    def claim_probe(self, name, probe_seconds):
+        """After the cooldown, let exactly one caller through to test the upstream."""
+        def claim(conn):
+            row = conn.execute("SELECT opened_until FROM circuit_breaker WHERE name = ?", (name,)).fetchone()
+            now = time.time()
+            if row is None or row[0] == 0 or row[0] > now:
+                return False
+            conn.execute("UPDATE circuit_breaker SET opened_until = ? WHERE name = ?", (now + probe_seconds, name))
+            return True
+        return self._transaction(claim)
+
+    def record_failure(self, name, threshold, cooldown, max_cooldown, probe=False):
+        def fail(conn):
+            now = time.time()
+            row = conn.execute("SELECT failures, opened_until, cooldown FROM circuit_breaker WHERE name = ?", (name,)).fetchone()
+            failures, opened_until, current = row or (0, 0.0, 0.0)
+            failures += 1
+            if failures >= threshold and (probe or opened_until <= now):
+                current = min(max_cooldown, current * 2) if current else cooldown
+                opened_until = now + current
+            conn.execute(
+                "INSERT INTO circuit_breaker (name, failures, opened_until, cooldown) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET failures = excluded.failures, "
+                "opened_until = excluded.opened_until, cooldown = excluded.cooldown",
+                (name, failures, opened_until, current)
+            )
+            return opened_until
+        return self._transaction(fail)
+
+    def record_success(self, name):
+        failures, opened_until, _ = self.circuit(name)
+        if failures or opened_until:
+            self._transaction(lambda conn: conn.execute(
+                "UPDATE circuit_breaker SET failures = 0, opened_until = 0, cooldown = 0 WHERE name = ?", (name,)
+            ))
+
+
+class ModelCallGuard:
+    """Rate limiting, retries with jittered backoff and a circuit breaker around one model."""
+
+    def __init__(self, state=None):
+        self.state = state or SharedLimiterState()
+        self._throttled = set()
+
+    def _wait_for_circuit(self, name):
+        cfg = config['default']
+        deadline = time.time() + cfg.BREAKER_MAX_WAIT
+        while True:
+            _, opened_until, _ = self.state.circuit(name)
+            now = time.time()
+            if not opened_until:
+                CIRCUIT_OPEN.labels(name).set(0)
+                return False
+            if opened_until <= now:
+                if self.state.claim_probe(name, cfg.BREAKER_PROBE_SECONDS):
+                    print(f"[DEBUG] Circuit for {name} half-open; sending a probe request")
+                    return True
+                opened_until = self.state.circuit(name)[1]
+            CIRCUIT_OPEN.labels(name).set(1)
+            if opened_until > deadline:
+                CIRCUIT_REJECTIONS.labels(name).inc()
+                raise UpstreamUnavailable(f"{name} is unavailable; retry after {max(0, opened_until - now):.1f}s")
+            time.sleep(max(0.05, min(opened_until - now, 1.0)))
+
+    def _acquire(self, name):
+        cfg = config['default']
+        started = time.time()
+        while True:
+            wait_for = self.state.take_token(name, cfg.MODEL_RATE_PER_MINUTE, cfg.MODEL_BURST)
+            if wait_for <= 0:
+                break
+            time.sleep(min(wait_for, 5.0) + random.uniform(0, 0.05))
+        waited = time.time() - started
+        MODEL_RATE_LIMIT_WAIT.observe(waited)
+        return waited
+
+    def call(self, name, fn, *args, **kwargs):
+        cfg = config['default']
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = self._wait_for_circuit(name)
+            self._acquire(name)
+            try:
+                result = fn(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                reason = "quota" if isinstance(e, QUOTA_ERRORS) else "unavailable"
+                if reason == "quota":
+                    rate = self.state.adjust_rate(name, factor=0.5, min_rate=cfg.MODEL_MIN_RATE_PER_MINUTE,
+                                                  max_rate=cfg.MODEL_RATE_PER_MINUTE)
+                    self._throttled.add(name)
+                    print(f"[WARN] {name} quota error; lowering shared rate to {rate:.1f}/min")
+                self.state.record_failure(name, cfg.BREAKER_FAILURE_THRESHOLD, cfg.BREAKER_COOLDOWN,
+                                          cfg.BREAKER_MAX_COOLDOWN, probe=probe)
+                if attempt > cfg.MODEL_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                MODEL_RETRIES.labels(reason).inc()
+                print(f"[WARN] {name} call failed ({type(e).__name__}); retry {attempt}/{cfg.MODEL_MAX_RETRIES} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.state.record_success(name)
+            if name in self._throttled:
+                rate = self.state.adjust_rate(name, increment=cfg.MODEL_RATE_PER_MINUTE * 0.05,
+                                              min_rate=cfg.MODEL_MIN_RATE_PER_MINUTE, max_rate=cfg.MODEL_RATE_PER_MINUTE)
+                if rate >= cfg.MODEL_RATE_PER_MINUTE:
+                    self._throttled.discard(name)
+            return result
+
+
+model_guard = ModelCallGuard()
@@ -0,0 +1,64 @@
+import hashlib
+import threading
+from app.utils.monitoring import COALESCED_REQUESTS
+
+
+class _Flight:
+
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers that use the same key."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+
+        if not leader:
+            COALESCED_REQUESTS.labels(self.name, 'shared').inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        COALESCED_REQUESTS.labels(self.name, 'leader').inc()
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            if flight.followers:
+                print(f"[DEBUG] {flight.followers} identical {self.name} request(s) shared one call")
+            flight.done.set()
+
+
+def flight_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+model_calls = SingleFlight("model")
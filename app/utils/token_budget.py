@@ -0,0 +1,132 @@
+import re
+from collections import OrderedDict
+from config import config
+
+
+MODEL_TOKEN_LIMITS = {
+    "gemini-2.5-pro": {"input": 1048576, "output": 65536},
+    "gemini-2.5-flash": {"input": 1048576, "output": 65536},
+    "gemini-2.5-flash-lite": {"input": 1048576, "output": 65536},
+    "gemini-2.0-flash": {"input": 1048576, "output": 8192},
+    "gemini-1.5-pro": {"input": 2097152, "output": 8192},
+    "gemini-1.5-flash": {"input": 1048576, "output": 8192},
+}
+DEFAULT_LIMITS = {"input": 32768, "output": 8192}
+
+_PIECES = re.compile(r"[A-Za-z]+|[0-9]+|\s+|[^\sA-Za-z0-9]")
+
+_CODE_EXTENSIONS = frozenset("""
+py pyi ipynb js jsx mjs cjs ts tsx vue svelte html htm css scss sass less json yaml yml toml ini cfg env
+md rst txt xml svg sql sh bash ps1 bat dockerfile go rs java kt kts swift c h cc cpp hpp cs php rb
+dart lua r scala gradle properties lock conf j2 jinja jinja2 ejs hbs graphql gql proto
+""".split())
+_PATH = re.compile(r"(?<![\w/.@-])((?:[\w.-]+/)*[\w-][\w.-]*\.([A-Za-z][A-Za-z0-9]{0,9}))(?![\w/-])")
+_FOLDER = re.compile(r"(?<![\w/.@:-])((?:[\w-][\w.-]*/)+)(?=[\s,;:)\]'\"`]|$)")
+_SPECIAL_FILES = re.compile(r"(?<![\w/.-])((?:[\w.-]+/)*(?:Dockerfile|Makefile|Procfile|\.env(?:\.example)?|\.gitignore))(?![\w/-])")
+_LIBRARY_NAMES = frozenset("""
+node.js next.js nuxt.js vue.js react.js express.js nest.js three.js d3.js chart.js alpine.js ember.js
+backbone.js socket.io moment.js p5.js
+""".split())
+
+
+def estimate_tokens(text):
+    """Rough local token count: words cost one token per ~4 letters, symbols and digits cost one each."""
+    if not text:
+        return 0
+    total = 0
+    for piece in _PIECES.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            total += (len(piece) + 3) // 4
+        elif first.isdigit():
+            total += (len(piece) + 2) // 3
+        elif first.isspace():
+            total += 1 if "\n" in piece or len(piece) > 4 else 0
+        else:
+            total += 1
+    return total
+
+def model_budget(model_name):
+    limits = MODEL_TOKEN_LIMITS.get(model_name)
+    if limits is None:
+        for name, values in MODEL_TOKEN_LIMITS.items():
+            if model_name and model_name.startswith(name):
+                limits = values
+                break
+    limits = limits or DEFAULT_LIMITS
+    safety = config['default'].TOKEN_BUDGET_SAFETY
+    return {
+        "model": model_name,
+        "input": int(limits["input"] * safety),
+        "output": int(limits["output"] * safety)
+    }
+
+def planned_paths(text):
+    """File paths and folders a step description mentions, in order of appearance."""
+    text = text or ""
+    found = OrderedDict()
+    for match in _PATH.finditer(text):
+        path, ext = match.group(1), match.group(2).lower()
+        if ext in _CODE_EXTENSIONS and not path.startswith(".") and path.lower() not in _LIBRARY_NAMES:
+            found.setdefault(path.strip("/"), True)
+    for match in _SPECIAL_FILES.finditer(text):
+        found.setdefault(match.group(1).strip("/"), True)
+    folders = OrderedDict()
+    for match in _FOLDER.finditer(text):
+        folder = match.group(1).strip("/")
+        if folder and not folder.startswith("http"):
+            folders.setdefault(folder, True)
+    return list(found), list(folders)
+
+def estimate_step_output(paths):
+    per_file = config['default'].STEP_TOKENS_PER_FILE
+    return per_file * max(1, len(paths)) + 200
+
+def _top_folder(path):
+    return path.split("/", 1)[0] if "/" in path else ""
+
+def _chunk(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def split_step(step_text, budget, force=False):
+    """Split a step into scopes that each fit the output budget.
+
+    Returns a list of ``{"folder": ..., "files": [...]}`` scopes, or an empty list when the
+    step fits in one request (or cannot be split). ``force`` splits even when the estimate
+    fits, which is used after a response came back truncated.
+    """
+    paths, folders = planned_paths(step_text)
+    if not force and estimate_step_output(paths) <= budget["output"]:
+        return []
+
+    groups = OrderedDict()
+    for path in paths:
+        groups.setdefault(_top_folder(path), []).append(path)
+    for folder in folders:
+        top = _top_folder(folder + "/")
+        if top and top not in groups:
+            groups[top] = []
+
+    per_file = config['default'].STEP_TOKENS_PER_FILE
+    files_per_request = max(1, (budget["output"] - 200) // per_file)
+    scopes = []
+    for folder, files in groups.items():
+        if not files:
+            scopes.append({"folder": folder, "files": []})
+            continue
+        size = files_per_request
+        if force and len(groups) == 1:
+            size = min(size, max(1, (len(files) + 1) // 2))
+        for batch in _chunk(files, size):
+            scopes.append({"folder": folder, "files": batch})
+    return scopes if len(scopes) > 1 else []
+
+def describe_scope(scope, index, total):
+    lines = [f"SCOPE: This is request {index} of {total} for this step; the other parts are generated in separate requests."]
+    if scope["files"]:
+        lines.append("Generate ONLY these files (plus tiny helpers inside the same folder if strictly needed): " + ", ".join(scope["files"]))
+    elif scope["folder"]:
+        lines.append(f"Generate ONLY the files that belong under the '{scope['folder']}/' folder.")
+    else:
+        lines.append("Generate ONLY the files that belong in the project root.")
+    return "\n".join(lines)
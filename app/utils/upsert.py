@@ -0,0 +1,13 @@
+from app import db
+
+
+def dialect_insert(model, dialect=None):
+    """``INSERT`` construct with ``ON CONFLICT`` support for the bound database, or None if unsupported."""
+    dialect = dialect or db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(model)
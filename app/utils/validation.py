@@ -0,0 +1,130 @@
+import ast
+import json
+import multiprocessing
+import os
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+
+def _check_python(code):
+    ast.parse(code)
+
+def _check_json(code):
+    json.loads(code)
+
+def _check_yaml(code):
+    for _ in yaml.safe_load_all(code):
+        pass
+
+def _check_toml(code):
+    tomllib.loads(code)
+
+def _check_xml(code):
+    ElementTree.fromstring(code)
+
+
+VALIDATORS = {
+    ".py": _check_python,
+    ".pyi": _check_python,
+    ".json": _check_json,
+    ".ipynb": _check_json,
+    ".xml": _check_xml,
+    ".svg": _check_xml,
+}
+if yaml is not None:
+    VALIDATORS[".yaml"] = _check_yaml
+    VALIDATORS[".yml"] = _check_yaml
+if tomllib is not None:
+    VALIDATORS[".toml"] = _check_toml
+
+# JSON flavours that allow comments and trailing commas.
+_LENIENT_JSON = {"tsconfig.json", "jsconfig.json", ".eslintrc.json", "devcontainer.json"}
+
+
+def validator_for(path):
+    name = os.path.basename(path).lower()
+    if name in _LENIENT_JSON:
+        return None
+    return VALIDATORS.get(os.path.splitext(name)[1])
+
+def validate_source(path, code):
+    """Return None when ``code`` parses for its file type, otherwise a short error message."""
+    check = validator_for(path)
+    if check is None:
+        return None
+    try:
+        check(code or "")
+    except SyntaxError as e:
+        return f"line {e.lineno}: {e.msg}"
+    except json.JSONDecodeError as e:
+        return f"line {e.lineno} col {e.colno}: {e.msg}"
+    except Exception as e:
+        return f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+    return None
+
+def _validate_batch(items):
+    return [(path, validate_source(path, code)) for path, code in items]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _process_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Workers are not forked: this process already runs generation, heartbeat and
+            # scheduler threads whose locks a forked child would inherit mid-use.
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+def _discard_pool(pool):
+    """Drop a failed pool so the next batch starts a fresh one instead of reusing a broken pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def validate_files(items, workers=2, min_parallel_chars=200000):
+    """Validate ``[(path, code), ...]``. Returns ``(errors_by_path, seconds)``.
+
+    Large batches are spread over a process pool so parsing does not hold the GIL of the
+    generation threads; small ones are checked inline, where a pool round trip would cost more.
+    """
+    started = time.time()
+    items = [(path, code) for path, code in items if validator_for(path) is not None]
+    if not items:
+        return {}, 0.0
+
+    total_chars = sum(len(code or "") for _, code in items)
+    if workers > 1 and len(items) > 1 and total_chars >= min_parallel_chars:
+        chunks = [items[i::workers] for i in range(workers)]
+        pool = None
+        try:
+            pool = _process_pool(workers)
+            results = [r for batch in pool.map(_validate_batch, [c for c in chunks if c]) for r in batch]
+        except Exception as e:
+            print(f"[WARN] Validation pool failed, validating inline: {e}")
+            if pool is not None:
+                _discard_pool(pool)
+            results = _validate_batch(items)
+    else:
+        results = _validate_batch(items)
+
+    errors = {path: error for path, error in results if error}
+    return errors, time.time() - started
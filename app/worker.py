@@ -0,0 +1,69 @@
+import argparse
+import os
+import signal
+import threading
+from app import create_app, db, init_database
+from app.services.job_queue import make_worker_id, claim_next, ensure_heartbeat, execute_claimed_job
+
+
+def _worker_loop(app, worker_id, poll_interval, stop):
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                job = claim_next(worker_id)
+                job_ref = (job.id, job.project_id) if job else None
+            except Exception as e:
+                db.session.rollback()
+                job_ref = None
+                print(f"[ERROR] Claiming a job failed: {e}")
+            finally:
+                db.session.remove()
+
+        if job_ref is None:
+            stop.wait(poll_interval)
+            continue
+        execute_claimed_job(app, job_ref[0], job_ref[1], worker_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daved AI project generation worker")
+    parser.add_argument('--config', default=os.environ.get('FLASK_CONFIG', 'default'))
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--poll-interval', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    app = create_app(args.config)
+    concurrency = args.concurrency or app.config['GENERATION_WORKERS']
+    poll_interval = args.poll_interval or app.config['GENERATION_POLL_INTERVAL']
+
+    init_database(app)
+
+    worker_id = make_worker_id("worker")
+    ensure_heartbeat(app, worker_id)
+
+    stop = threading.Event()
+    def _shutdown(signum, frame):
+        print(f"[DEBUG] Worker {worker_id} stopping after current jobs (signal {signum})")
+        stop.set()
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    threads = []
+    for i in range(concurrency):
+        t = threading.Thread(
+            target=_worker_loop,
+            args=(app, worker_id, poll_interval, stop),
+            name=f"job-worker-{i}",
+            daemon=True
+        )
+        t.start()
+        threads.append(t)
+    print(f"[DEBUG] Worker {worker_id} started with {concurrency} threads")
+
+    while any(t.is_alive() for t in threads):
+        for t in threads:
+            t.join(timeout=1.0)
+
+
+if __name__ == '__main__':
+    main()
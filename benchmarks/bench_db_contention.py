@@ -0,0 +1,147 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from config import config
+from app import db
+from app.models import User, Project, ProjectStep, CodeFile
+from app.utils.db_engine import engine_options, configure_engine
+from app.utils.upsert import dialect_insert
+
+
+def make_engine(url, tuned):
+    if not tuned:
+        return create_engine(url)
+    settings = {key: getattr(config['default'], key) for key in dir(config['default']) if key.isupper()}
+    settings["SQLALCHEMY_DATABASE_URI"] = url
+    engine = create_engine(url, **engine_options(settings))
+    configure_engine(engine, settings)
+    return engine
+
+def seed(engine, generators, steps):
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="bench", email="bench@example.com")
+        session.add(user)
+        session.flush()
+        projects = [Project(user_id=user.id, title=f"bench {n}", status="queued") for n in range(generators)]
+        session.add_all(projects)
+        session.flush()
+        for project in projects:
+            session.add_all(ProjectStep(project_id=project.id, step_number=i + 1, title=f"step {i + 1}", status="pending")
+                            for i in range(steps))
+        session.commit()
+        return [p.id for p in projects]
+
+def generator(engine, project_id, steps, files_per_step, stats, lock):
+    """Mimic one project run: status updates and a batch of file rows per step."""
+    local = {"writes": 0, "errors": 0, "latencies": []}
+    code = "x = 1\n" * 200
+    for n in range(steps):
+        started = time.perf_counter()
+        try:
+            with Session(engine) as session:
+                step_id = session.scalar(select(ProjectStep.id).where(
+                    ProjectStep.project_id == project_id, ProjectStep.step_number == n + 1))
+                session.execute(update(ProjectStep).where(ProjectStep.id == step_id).values(status="in-progress"))
+                session.commit()
+
+                rows = [{
+                    "project_id": project_id, "step_id": step_id, "folder_path": f"pkg{n}",
+                    "file_name": f"m{i}.py", "content_hash": None, "file_size": len(code),
+                    "revision": 1, "created_at": datetime.utcnow(),
+                } for i in range(files_per_step)]
+                insert = dialect_insert(CodeFile, engine.dialect.name)
+                if insert is not None:
+                    session.execute(insert.on_conflict_do_nothing(), rows)
+                else:
+                    session.add_all(CodeFile(**row) for row in rows)
+                session.execute(update(ProjectStep).where(ProjectStep.id == step_id).values(status="completed"))
+                session.execute(update(Project).where(Project.id == project_id).values(updated_at=datetime.utcnow()))
+                session.commit()
+            local["writes"] += 2
+        except OperationalError as e:
+            local["errors"] += 1
+            if "locked" not in str(e).lower() and "busy" not in str(e).lower():
+                raise
+        local["latencies"].append(time.perf_counter() - started)
+    with lock:
+        for key in ("writes", "errors"):
+            stats[key] += local[key]
+        stats["latencies"].extend(local["latencies"])
+
+def poller(engine, project_ids, stop, stats, lock):
+    """Mimic /codegen/status polling while generation runs."""
+    reads = 0
+    while not stop.is_set():
+        with Session(engine) as session:
+            for project_id in project_ids:
+                session.execute(select(ProjectStep.status).where(ProjectStep.project_id == project_id)).all()
+                reads += 1
+        time.sleep(0.01)
+    with lock:
+        stats["reads"] += reads
+
+def run_case(engine, generators, steps, files_per_step, pollers):
+    project_ids = seed(engine, generators, steps)
+    stats = {"writes": 0, "errors": 0, "reads": 0, "latencies": []}
+    lock = threading.Lock()
+    stop = threading.Event()
+    readers = [threading.Thread(target=poller, args=(engine, project_ids, stop, stats, lock)) for _ in range(pollers)]
+    writers = [threading.Thread(target=generator, args=(engine, pid, steps, files_per_step, stats, lock))
+               for pid in project_ids]
+    started = time.perf_counter()
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in readers:
+        t.join()
+    latencies = sorted(stats["latencies"]) or [0.0]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return stats["writes"] / elapsed, stats["errors"], stats["reads"] / elapsed, p95
+
+def run(url=None, generators=(1, 4, 16), steps=20, files_per_step=10, pollers=2):
+    workdir = None
+    if url is None:
+        workdir = tempfile.mkdtemp(prefix="bench_db_")
+    print(f"{'profile':>9} {'N':>4} {'writes/s':>10} {'locked':>8} {'reads/s':>10} {'p95 step ms':>12}")
+    try:
+        for tuned in (False, True):
+            for n in generators:
+                case_url = url or "sqlite:///" + os.path.join(workdir, f"bench_{int(tuned)}_{n}.db")
+                engine = make_engine(case_url, tuned)
+                try:
+                    writes, errors, reads, p95 = run_case(engine, n, steps, files_per_step, pollers)
+                finally:
+                    engine.dispose()
+                name = "tuned" if tuned else "default"
+                print(f"{name:>9} {n:>4} {writes:>10.1f} {errors:>8} {reads:>10.1f} {p95 * 1000:>12.1f}")
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write throughput with N concurrent generators")
+    parser.add_argument("--url", help="database URL (default: a temporary SQLite file); tables are recreated")
+    parser.add_argument("--generators", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--pollers", type=int, default=2)
+    args = parser.parse_args()
+    run(args.url, tuple(int(n) for n in args.generators.split(",")), args.steps, args.files, args.pollers)
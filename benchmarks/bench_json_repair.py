@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.json_repair import parse_model_json
+
+
+def legacy_strip_code_fences(s: str) -> str:
+    if not s:
+        return s
+    s = s.strip()
+    if s.startswith("```"):
+        s = s.lstrip("`")
+        first_brace = s.find("{")
+        if first_brace != -1:
+            s = s[first_brace:]
+        s = s.rstrip("`").strip()
+    if s.lower().startswith("json"):
+        s = s[4:].lstrip("\n").lstrip()
+    return s
+
+
+def legacy_sanitize_json_string(s: str) -> str:
+    if not s:
+        return s
+    s = s.replace("\x00", "")
+    def escape_in_string(m):
+        content = m.group(0)
+        content = re.sub(r'(?<!\\)\\(?![btnfr"\\/])', r'\\\\', content)
+        content = content.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+        return content
+    return re.sub(r'".*?(?<!\\)"', escape_in_string, s, flags=re.S)
+
+
+def legacy_try_quick_json_ok(s: str) -> bool:
+    try:
+        cleaned = legacy_strip_code_fences(s or "")
+        sanitized = legacy_sanitize_json_string(cleaned)
+        obj = json.loads(sanitized)
+        if not isinstance(obj, dict):
+            return False
+        files = obj.get("files", [])
+        if files and not isinstance(files, list):
+            return True
+        return bool(files)
+    except Exception:
+        return False
+
+
+def legacy_parse(response_text):
+    legacy_try_quick_json_ok(response_text)
+    cleaned = legacy_strip_code_fences(response_text)
+    sanitized = legacy_sanitize_json_string(cleaned)
+    try:
+        return json.loads(sanitized)
+    except json.JSONDecodeError:
+        first = sanitized.find("{")
+        last = sanitized.rfind("}")
+        substring = legacy_sanitize_json_string(sanitized[first:last + 1])
+        return json.loads(substring)
+
+
+def make_payload(target_kb, raw_newlines=True, bad_escapes=True):
+    body = [
+        "import re",
+        "PATTERN = re.compile('\\d+\\s*')" if bad_escapes else "PATTERN = None",
+        "def handler(event, context):",
+        "    return {'status': 200, 'body': 'ok'}",
+    ]
+    files = []
+    size = 0
+    i = 0
+    while size < target_kb * 1024:
+        code = "\n".join(body * 20)
+        files.append({"folder": f"app/module_{i}", "file": f"file_{i}.py", "code": code})
+        size += len(code)
+        i += 1
+    text = json.dumps({"files": files, "instructions": ["pip install -r requirements.txt"]})
+    if raw_newlines:
+        text = text.replace("\\n", "\n")
+    if bad_escapes:
+        text = text.replace("\\\\d", "\\d").replace("\\\\s", "\\s")
+    return "```json\n" + text + "\n```\nLet me know if you need anything else."
+
+
+def run(sizes=(16, 128, 512), number=5):
+    print(f"{'size':>8} {'legacy ms':>12} {'single-pass ms':>16} {'speedup':>9}")
+    for kb in sizes:
+        payload = make_payload(kb)
+        expected = legacy_parse(payload)
+        assert parse_model_json(payload) == expected, "parsers disagree"
+        legacy = timeit.timeit(lambda: legacy_parse(payload), number=number) / number
+        single = timeit.timeit(lambda: parse_model_json(payload), number=number) / number
+        print(f"{kb:>6}KB {legacy * 1000:>12.2f} {single * 1000:>16.2f} {legacy / single:>8.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -10,12 +10,64 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'daved_ai.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_PROFILE = os.environ.get('DB_PROFILE') or 'auto'
+    DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT') or 30)
+    DB_SQLITE_SYNCHRONOUS = os.environ.get('DB_SQLITE_SYNCHRONOUS') or 'NORMAL'
+    DB_SQLITE_CACHE_MB = int(os.environ.get('DB_SQLITE_CACHE_MB') or 32)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 20)
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 30)
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    KEYSET_EXACT_COUNT_MAX = int(os.environ.get('KEYSET_EXACT_COUNT_MAX') or 10000)
+    STATS_RECONCILE_SECONDS = int(os.environ.get('STATS_RECONCILE_SECONDS') or 3600)
+    STATS_RECONCILE_DAYS = int(os.environ.get('STATS_RECONCILE_DAYS') or 30)
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY') or ''
+    GEMINI_TRANSPORT = os.environ.get('GEMINI_TRANSPORT') or None
+    MODEL_LIMITS_PATH = os.environ.get('MODEL_LIMITS_PATH') or os.path.join(basedir, 'model_limits.db')
+    MODEL_RATE_PER_MINUTE = float(os.environ.get('MODEL_RATE_PER_MINUTE') or 60)
+    MODEL_MIN_RATE_PER_MINUTE = float(os.environ.get('MODEL_MIN_RATE_PER_MINUTE') or 6)
+    MODEL_BURST = int(os.environ.get('MODEL_BURST') or 10)
+    MODEL_MAX_RETRIES = int(os.environ.get('MODEL_MAX_RETRIES') or 3)
+    MODEL_BACKOFF_BASE = float(os.environ.get('MODEL_BACKOFF_BASE') or 1.0)
+    MODEL_BACKOFF_MAX = float(os.environ.get('MODEL_BACKOFF_MAX') or 30)
+    BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD') or 5)
+    BREAKER_COOLDOWN = float(os.environ.get('BREAKER_COOLDOWN') or 15)
+    BREAKER_MAX_COOLDOWN = float(os.environ.get('BREAKER_MAX_COOLDOWN') or 300)
+    BREAKER_PROBE_SECONDS = float(os.environ.get('BREAKER_PROBE_SECONDS') or 30)
+    BREAKER_MAX_WAIT = float(os.environ.get('BREAKER_MAX_WAIT') or 60)
+    INTENT_CACHE_SIZE = int(os.environ.get('INTENT_CACHE_SIZE') or 2048)
+    INTENT_CACHE_TTL = int(os.environ.get('INTENT_CACHE_TTL') or 7 * 24 * 3600)
+    PLAN_CACHE_ENABLED = (os.environ.get('PLAN_CACHE_ENABLED') or 'true').lower() == 'true'
+    PLAN_CACHE_SIMILARITY = float(os.environ.get('PLAN_CACHE_SIMILARITY') or 0.85)
+    PLAN_CACHE_RELOAD_SECONDS = int(os.environ.get('PLAN_CACHE_RELOAD_SECONDS') or 300)
     TEMP_PROJECTS_DIR = os.path.join(basedir, 'temp_projects')
     ZIP_DIR = os.path.join(basedir, 'static/zips')
     UPLOAD_FOLDER = os.path.join(basedir, 'static/uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'mp4'}
+    GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS') or 4)
+    GENERATION_QUEUE_SIZE = int(os.environ.get('GENERATION_QUEUE_SIZE') or 32)
+    GENERATION_QUEUE_TIMEOUT = float(os.environ.get('GENERATION_QUEUE_TIMEOUT') or 0)
+    GENERATION_BACKEND = os.environ.get('GENERATION_BACKEND') or 'inline'
+    GENERATION_LEASE_SECONDS = int(os.environ.get('GENERATION_LEASE_SECONDS') or 120)
+    GENERATION_MAX_ATTEMPTS = int(os.environ.get('GENERATION_MAX_ATTEMPTS') or 3)
+    PROJECT_STEP_CONCURRENCY = int(os.environ.get('PROJECT_STEP_CONCURRENCY') or 3)
+    GENERATION_POLL_INTERVAL = float(os.environ.get('GENERATION_POLL_INTERVAL') or 2)
+    CODE_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CODE_CONTEXT_TOKEN_BUDGET') or 6000)
+    TOKEN_BUDGET_SAFETY = float(os.environ.get('TOKEN_BUDGET_SAFETY') or 0.8)
+    STEP_TOKENS_PER_FILE = int(os.environ.get('STEP_TOKENS_PER_FILE') or 1500)
+    STEP_MAX_CONTINUATIONS = int(os.environ.get('STEP_MAX_CONTINUATIONS') or 3)
+    VALIDATION_WORKERS = int(os.environ.get('VALIDATION_WORKERS') or 2)
+    VALIDATION_PARALLEL_MIN_CHARS = int(os.environ.get('VALIDATION_PARALLEL_MIN_CHARS') or 200000)
+    BLOB_COMPRESSION = os.environ.get('BLOB_COMPRESSION') or 'zlib'
+    BLOB_COMPRESSION_LEVEL = int(os.environ.get('BLOB_COMPRESSION_LEVEL') or 6)
+    BLOB_PRUNE_SECONDS = int(os.environ.get('BLOB_PRUNE_SECONDS') or 3600)
+    BLOB_PRUNE_GRACE_SECONDS = int(os.environ.get('BLOB_PRUNE_GRACE_SECONDS') or 3600)
+    REVISION_SNAPSHOT_INTERVAL = int(os.environ.get('REVISION_SNAPSHOT_INTERVAL') or 8)
+    REVISION_MAX_PER_FILE = int(os.environ.get('REVISION_MAX_PER_FILE') or 32)
+    HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE') or 0.95)
+    HEDGE_MIN_SAMPLES = int(os.environ.get('HEDGE_MIN_SAMPLES') or 20)
+    HEDGE_MAX_PER_MINUTE = int(os.environ.get('HEDGE_MAX_PER_MINUTE') or 6)
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -0,0 +1,116 @@
+"""baseline schema
+
+Revision ID: 1a2b3c4d5e6f
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+The tables as they existed before migrations were added. Databases created by earlier
+releases already have them, so every table is only created when it is missing; the same
+goes for the revisions that follow, which lets ``db.create_all()`` and ``flask db upgrade``
+be used on the same database.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a2b3c4d5e6f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(table):
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def upgrade():
+    if not _has_table('user'):
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=64), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=True),
+            sa.Column('password_hash', sa.String(length=128), nullable=True),
+            sa.Column('is_admin', sa.Boolean(), nullable=True),
+            sa.Column('theme', sa.String(length=20), nullable=True),
+            sa.Column('language', sa.String(length=10), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_login', sa.DateTime(), nullable=True),
+            sa.Column('active', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_user_email', 'user', ['email'], unique=True)
+        op.create_index('ix_user_username', 'user', ['username'], unique=True)
+    if not _has_table('feature_flag'):
+        op.create_table(
+            'feature_flag',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('description', sa.String(length=255), nullable=True),
+            sa.Column('is_enabled', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+    if not _has_table('project'):
+        op.create_table(
+            'project',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('title', sa.String(length=255), nullable=True),
+            sa.Column('original_prompt', sa.Text(), nullable=True),
+            sa.Column('improved_prompt', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('admin_activity'):
+        op.create_table(
+            'admin_activity',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('admin_id', sa.Integer(), nullable=True),
+            sa.Column('action', sa.String(length=255), nullable=True),
+            sa.Column('target_type', sa.String(length=50), nullable=True),
+            sa.Column('target_id', sa.Integer(), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['admin_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('project_step'):
+        op.create_table(
+            'project_step',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('project_id', sa.Integer(), nullable=True),
+            sa.Column('step_number', sa.Integer(), nullable=True),
+            sa.Column('title', sa.String(length=255), nullable=True),
+            sa.Column('details', sa.Text(), nullable=True),
+            sa.Column('deliverables', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['project_id'], ['project.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('code_file'):
+        op.create_table(
+            'code_file',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('project_id', sa.Integer(), nullable=True),
+            sa.Column('step_id', sa.Integer(), nullable=True),
+            sa.Column('folder_path', sa.String(length=255), nullable=True),
+            sa.Column('file_name', sa.String(length=255), nullable=True),
+            sa.Column('file_content', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['project_id'], ['project.id']),
+            sa.ForeignKeyConstraint(['step_id'], ['project_step.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    for table in ('code_file', 'project_step', 'admin_activity', 'project', 'feature_flag', 'user'):
+        if _has_table(table):
+            op.drop_table(table)
@@ -0,0 +1,45 @@
+"""generation_job table
+
+Revision ID: 2c7e91b04d3a
+Revises: 1a2b3c4d5e6f
+Create Date: 2026-10-17 09:05:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7e91b04d3a'
+down_revision = '1a2b3c4d5e6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('generation_job'):
+        return
+    op.create_table(
+        'generation_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('max_attempts', sa.Integer(), nullable=True),
+        sa.Column('worker_id', sa.String(length=128), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_generation_job_project_id', 'generation_job', ['project_id'])
+    op.create_index('ix_generation_job_status', 'generation_job', ['status'])
+    op.create_index('ix_generation_job_lease_expires_at', 'generation_job', ['lease_expires_at'])
+
+
+def downgrade():
+    if sa.inspect(op.get_bind()).has_table('generation_job'):
+        op.drop_table('generation_job')
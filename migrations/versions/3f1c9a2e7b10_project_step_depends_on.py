@@ -0,0 +1,36 @@
+"""project_step.depends_on
+
+Revision ID: 3f1c9a2e7b10
+Revises: 2c7e91b04d3a
+Create Date: 2026-10-17 09:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a2e7b10'
+down_revision = '2c7e91b04d3a'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = _columns('project_step')
+    if columns is not None and 'depends_on' not in columns:
+        with op.batch_alter_table('project_step') as batch_op:
+            batch_op.add_column(sa.Column('depends_on', sa.Text(), nullable=True))
+
+
+def downgrade():
+    if 'depends_on' in (_columns('project_step') or ()):
+        with op.batch_alter_table('project_step') as batch_op:
+            batch_op.drop_column('depends_on')
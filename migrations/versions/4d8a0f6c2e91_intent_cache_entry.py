@@ -0,0 +1,40 @@
+"""intent_cache_entry table
+
+Revision ID: 4d8a0f6c2e91
+Revises: 3f1c9a2e7b10
+Create Date: 2026-10-17 09:15:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8a0f6c2e91'
+down_revision = '3f1c9a2e7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('intent_cache_entry'):
+        return
+    op.create_table(
+        'intent_cache_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prompt_hash', sa.String(length=64), nullable=False),
+        sa.Column('normalized_prompt', sa.Text(), nullable=True),
+        sa.Column('is_code_related', sa.Boolean(), nullable=True),
+        sa.Column('reason', sa.String(length=255), nullable=True),
+        sa.Column('hits', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_intent_cache_entry_prompt_hash', 'intent_cache_entry', ['prompt_hash'], unique=True)
+    op.create_index('ix_intent_cache_entry_created_at', 'intent_cache_entry', ['created_at'])
+
+
+def downgrade():
+    if sa.inspect(op.get_bind()).has_table('intent_cache_entry'):
+        op.drop_table('intent_cache_entry')
@@ -0,0 +1,39 @@
+"""plan_cache_entry table
+
+Revision ID: 5e3b7c1a9d20
+Revises: 4d8a0f6c2e91
+Create Date: 2026-10-17 09:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e3b7c1a9d20'
+down_revision = '4d8a0f6c2e91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('plan_cache_entry'):
+        return
+    op.create_table(
+        'plan_cache_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prompt_hash', sa.String(length=64), nullable=False),
+        sa.Column('normalized_prompt', sa.Text(), nullable=True),
+        sa.Column('signature', sa.Text(), nullable=True),
+        sa.Column('plan_json', sa.Text(), nullable=True),
+        sa.Column('hits', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_plan_cache_entry_prompt_hash', 'plan_cache_entry', ['prompt_hash'], unique=True)
+
+
+def downgrade():
+    if sa.inspect(op.get_bind()).has_table('plan_cache_entry'):
+        op.drop_table('plan_cache_entry')
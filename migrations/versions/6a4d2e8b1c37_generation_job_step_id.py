@@ -0,0 +1,38 @@
+"""generation_job.step_id
+
+Revision ID: 6a4d2e8b1c37
+Revises: 5e3b7c1a9d20
+Create Date: 2026-10-17 09:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a4d2e8b1c37'
+down_revision = '5e3b7c1a9d20'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = _columns('generation_job')
+    if columns is not None and 'step_id' not in columns:
+        with op.batch_alter_table('generation_job') as batch_op:
+            batch_op.add_column(sa.Column('step_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_generation_job_step_id', 'project_step', ['step_id'], ['id'])
+
+
+def downgrade():
+    if 'step_id' in (_columns('generation_job') or ()):
+        with op.batch_alter_table('generation_job') as batch_op:
+            batch_op.drop_constraint('fk_generation_job_step_id', type_='foreignkey')
+            batch_op.drop_column('step_id')
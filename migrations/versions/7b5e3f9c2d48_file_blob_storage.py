@@ -0,0 +1,170 @@
+"""file_blob table; code_file contents moved into blobs
+
+Revision ID: 7b5e3f9c2d48
+Revises: 6a4d2e8b1c37
+Create Date: 2026-10-17 09:40:00
+
+"""
+import hashlib
+import zlib
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b5e3f9c2d48'
+down_revision = '6a4d2e8b1c37'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+file_blob = sa.table(
+    'file_blob',
+    sa.column('content_hash', sa.String),
+    sa.column('compression', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('data', sa.LargeBinary),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _code_file(*names):
+    types = {'id': sa.Integer, 'file_content': sa.Text, 'content_hash': sa.String, 'file_size': sa.Integer}
+    return sa.table('code_file', *(sa.column(name, types[name]) for name in names))
+
+
+def _blob_row(text):
+    # Same layout as app.utils.blob_store, kept local so the migration does not change with the app.
+    raw = text.encode('utf-8')
+    data = zlib.compress(raw, 6)
+    method = 'zlib'
+    if len(data) >= len(raw):
+        method, data = 'none', raw
+    return {
+        'content_hash': hashlib.sha256(raw).hexdigest(),
+        'compression': method,
+        'size': len(raw),
+        'data': data,
+        'created_at': datetime.utcnow(),
+    }
+
+
+def _blob_text(method, data):
+    if method == 'zlib':
+        return zlib.decompress(data).decode('utf-8')
+    if method == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    return bytes(data).decode('utf-8')
+
+
+def _backfill_blobs(bind):
+    code_file = _code_file('id', 'file_content', 'content_hash', 'file_size')
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(code_file.c.id, code_file.c.file_content)
+            .where(code_file.c.id > last_id)
+            .order_by(code_file.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        blobs = {}
+        for row_id, text in rows:
+            blob = _blob_row(text or '')
+            blobs.setdefault(blob['content_hash'], blob)
+            bind.execute(
+                code_file.update().where(code_file.c.id == row_id)
+                .values(content_hash=blob['content_hash'], file_size=blob['size'])
+            )
+        known = {h for (h,) in bind.execute(
+            sa.select(file_blob.c.content_hash).where(file_blob.c.content_hash.in_(list(blobs)))
+        )}
+        missing = [blob for digest, blob in blobs.items() if digest not in known]
+        if missing:
+            bind.execute(file_blob.insert(), missing)
+        last_id = rows[-1][0]
+
+
+def _restore_contents(bind):
+    code_file = _code_file('id', 'file_content', 'content_hash')
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(code_file.c.id, code_file.c.content_hash)
+            .where(code_file.c.id > last_id)
+            .order_by(code_file.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        digests = list({digest for _, digest in rows if digest})
+        texts = {
+            digest: _blob_text(method, data)
+            for digest, method, data in bind.execute(
+                sa.select(file_blob.c.content_hash, file_blob.c.compression, file_blob.c.data)
+                .where(file_blob.c.content_hash.in_(digests))
+            )
+        }
+        for row_id, digest in rows:
+            bind.execute(
+                code_file.update().where(code_file.c.id == row_id)
+                .values(file_content=texts.get(digest, ''))
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('file_blob'):
+        op.create_table(
+            'file_blob',
+            sa.Column('content_hash', sa.String(length=64), nullable=False),
+            sa.Column('compression', sa.String(length=10), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('data', sa.LargeBinary(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('content_hash')
+        )
+
+    columns = _columns('code_file')
+    if columns is None:
+        return
+    if 'content_hash' not in columns:
+        with op.batch_alter_table('code_file') as batch_op:
+            batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+            batch_op.add_column(sa.Column('file_size', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_code_file_content_hash', 'file_blob', ['content_hash'], ['content_hash'])
+            batch_op.create_index('ix_code_file_content_hash', ['content_hash'])
+    if 'file_content' in columns:
+        _backfill_blobs(bind)
+        with op.batch_alter_table('code_file') as batch_op:
+            batch_op.drop_column('file_content')
+
+
+def downgrade():
+    bind = op.get_bind()
+    columns = _columns('code_file')
+    if columns is not None and 'content_hash' in columns:
+        if 'file_content' not in columns:
+            with op.batch_alter_table('code_file') as batch_op:
+                batch_op.add_column(sa.Column('file_content', sa.Text(), nullable=True))
+        _restore_contents(bind)
+        with op.batch_alter_table('code_file') as batch_op:
+            batch_op.drop_index('ix_code_file_content_hash')
+            batch_op.drop_constraint('fk_code_file_content_hash', type_='foreignkey')
+            batch_op.drop_column('content_hash')
+            batch_op.drop_column('file_size')
+    if sa.inspect(bind).has_table('file_blob'):
+        op.drop_table('file_blob')
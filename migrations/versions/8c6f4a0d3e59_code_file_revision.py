@@ -0,0 +1,58 @@
+"""code_file.revision and code_file_revision table
+
+Revision ID: 8c6f4a0d3e59
+Revises: 7b5e3f9c2d48
+Create Date: 2026-10-17 09:50:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c6f4a0d3e59'
+down_revision = '7b5e3f9c2d48'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = _columns('code_file')
+    if columns is not None and 'revision' not in columns:
+        with op.batch_alter_table('code_file') as batch_op:
+            batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=True))
+        op.execute("UPDATE code_file SET revision = 0")
+
+    if not sa.inspect(op.get_bind()).has_table('code_file_revision'):
+        op.create_table(
+            'code_file_revision',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('code_file_id', sa.Integer(), nullable=False),
+            sa.Column('step_id', sa.Integer(), nullable=True),
+            sa.Column('revision', sa.Integer(), nullable=False),
+            sa.Column('content_hash', sa.String(length=64), nullable=True),
+            sa.Column('delta', sa.LargeBinary(), nullable=True),
+            sa.Column('size', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['code_file_id'], ['code_file.id']),
+            sa.ForeignKeyConstraint(['step_id'], ['project_step.id']),
+            sa.ForeignKeyConstraint(['content_hash'], ['file_blob.content_hash']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('code_file_id', 'revision')
+        )
+        op.create_index('ix_code_file_revision_code_file_id', 'code_file_revision', ['code_file_id'])
+
+
+def downgrade():
+    if sa.inspect(op.get_bind()).has_table('code_file_revision'):
+        op.drop_table('code_file_revision')
+    if 'revision' in (_columns('code_file') or ()):
+        with op.batch_alter_table('code_file') as batch_op:
+            batch_op.drop_column('revision')
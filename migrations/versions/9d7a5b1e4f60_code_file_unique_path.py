@@ -0,0 +1,46 @@
+"""unique (project_id, folder_path, file_name) on code_file
+
+Revision ID: 9d7a5b1e4f60
+Revises: 8c6f4a0d3e59
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d7a5b1e4f60'
+down_revision = '8c6f4a0d3e59'
+branch_labels = None
+depends_on = None
+
+# Rows that lose to a newer row for the same path; the upsert keeps only one per path.
+DUPLICATES = (
+    "SELECT id FROM code_file WHERE id NOT IN "
+    "(SELECT MAX(id) FROM code_file GROUP BY project_id, folder_path, file_name)"
+)
+
+
+def _unique_constraints(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {constraint['name'] for constraint in inspector.get_unique_constraints(table)}
+
+
+def upgrade():
+    constraints = _unique_constraints('code_file')
+    if constraints is None or 'uq_code_file_path' in constraints:
+        return
+    if sa.inspect(op.get_bind()).has_table('code_file_revision'):
+        op.execute(f"DELETE FROM code_file_revision WHERE code_file_id IN ({DUPLICATES})")
+    op.execute(f"DELETE FROM code_file WHERE id IN ({DUPLICATES})")
+    with op.batch_alter_table('code_file') as batch_op:
+        batch_op.create_unique_constraint('uq_code_file_path', ['project_id', 'folder_path', 'file_name'])
+
+
+def downgrade():
+    if 'uq_code_file_path' in (_unique_constraints('code_file') or ()):
+        with op.batch_alter_table('code_file') as batch_op:
+            batch_op.drop_constraint('uq_code_file_path', type_='unique')
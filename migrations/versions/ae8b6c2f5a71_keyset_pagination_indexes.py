@@ -0,0 +1,42 @@
+"""composite indexes for keyset pagination
+
+Revision ID: ae8b6c2f5a71
+Revises: 9d7a5b1e4f60
+Create Date: 2026-10-17 10:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ae8b6c2f5a71'
+down_revision = '9d7a5b1e4f60'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_user_created_at_id', 'user', ['created_at', 'id']),
+    ('ix_project_created_at_id', 'project', ['created_at', 'id']),
+    ('ix_admin_activity_timestamp_id', 'admin_activity', ['timestamp', 'id']),
+)
+
+
+def _indexes(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        existing = _indexes(table)
+        if existing is not None and name not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        if name in (_indexes(table) or ()):
+            op.drop_index(name, table_name=table)
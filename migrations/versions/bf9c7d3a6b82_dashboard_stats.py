@@ -0,0 +1,56 @@
+"""dashboard_stats and daily_stats tables
+
+Revision ID: bf9c7d3a6b82
+Revises: ae8b6c2f5a71
+Create Date: 2026-10-17 10:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bf9c7d3a6b82'
+down_revision = 'ae8b6c2f5a71'
+branch_labels = None
+depends_on = None
+
+
+def _counter(name):
+    return sa.Column(name, sa.Integer(), nullable=False, server_default='0')
+
+
+def upgrade():
+    # The counters start empty; the first dashboard view or scheduled reconcile fills them.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('dashboard_stats'):
+        op.create_table(
+            'dashboard_stats',
+            sa.Column('id', sa.Integer(), nullable=False),
+            _counter('total_users'),
+            _counter('total_projects'),
+            _counter('queued_projects'),
+            _counter('in_progress_projects'),
+            _counter('completed_projects'),
+            _counter('failed_projects'),
+            _counter('other_projects'),
+            sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if not inspector.has_table('daily_stats'):
+        op.create_table(
+            'daily_stats',
+            sa.Column('day', sa.Date(), nullable=False),
+            _counter('new_users'),
+            _counter('active_users'),
+            _counter('new_projects'),
+            sa.PrimaryKeyConstraint('day')
+        )
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in ('daily_stats', 'dashboard_stats'):
+        if inspector.has_table(table):
+            op.drop_table(table)
@@ -0,0 +1,37 @@
+"""file_blob.last_used_at
+
+Revision ID: c1d0e8b4a793
+Revises: bf9c7d3a6b82
+Create Date: 2026-10-17 10:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1d0e8b4a793'
+down_revision = 'bf9c7d3a6b82'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = _columns('file_blob')
+    if columns is not None and 'last_used_at' not in columns:
+        with op.batch_alter_table('file_blob') as batch_op:
+            batch_op.add_column(sa.Column('last_used_at', sa.DateTime(), nullable=True))
+        op.execute("UPDATE file_blob SET last_used_at = created_at")
+
+
+def downgrade():
+    if 'last_used_at' in (_columns('file_blob') or ()):
+        with op.batch_alter_table('file_blob') as batch_op:
+            batch_op.drop_column('last_used_at')
@@ -1,11 +1,20 @@
 
-from app import create_app, db
+from app import create_app, init_database
 from app.models import *
 
 app = create_app()
 
-with app.app_context():
-    db.create_all()
+init_database(app)
+
+from app.services.stats_service import schedule_stats_reconcile
+schedule_stats_reconcile(app)
+
+from app.utils.blob_store import schedule_blob_pruning
+schedule_blob_pruning(app)
+
+if app.config.get('GENERATION_BACKEND') == 'inline':
+    from app.services.job_queue import schedule_job_recovery
+    schedule_job_recovery(app)
 
 if __name__ == '__main__':
     